@@ -1 +1 @@
-from . import embed, proxy
+from . import embed, metrics, proxy
@@ -1,12 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
+from typing import List, Literal
 from uuid import uuid4
 from datetime import datetime, timedelta, timezone
+import asyncio
 import os
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_session
-from app.db.crud import create_embed as crud_create_embed
+from app.db.crud import create_embed as crud_create_embed, create_embeds, find_by_token, replace_snapshot
+from app.services import open_cypher_stream
+from app.services.admission import AdmissionRejected, bind_client
+from app.services.cancellation import cancel_on_disconnect
+from app.services.limits import ResultTruncated
+from app.services.neo4j_service import GRAPH
+from app.services.result_cache import embed_result_cache, invalidate_snapshot_results, load_embed_result
+from app.services.serialization import coalesce_chunks, dumps
+from app.services.singleflight import SingleFlight
+from app.services.snapshots import capture_snapshot
+from app.cache import TTLCache
+from app.config import settings
+from app.static_assets import PrecompressedAsset, public_assets
 
 router = APIRouter()
 
@@ -23,12 +38,18 @@ class EmbedRequest(BaseModel):
         ge=1,
         example=7
     )
+    snapshot: bool = Field(
+        False,
+        description="Run the query once now and serve views from the stored result instead of Neo4j",
+        example=False
+    )
     
     class Config:
         schema_extra = {
             "example": {
                 "cypherQuery": "MATCH (p:Person)-[r:ACTED_IN]->(m:Movie) RETURN p,r,m LIMIT 25",
-                "expiresInDays": 7
+                "expiresInDays": 7,
+                "snapshot": False
             }
         }
 
@@ -51,6 +72,11 @@ class EmbedResponse(BaseModel):
         }
 
 
+class EmbedBatchResponse(BaseModel):
+    success: bool = Field(True, description="Success status")
+    data: List[dict] = Field(..., description="Embed data for each request, in request order")
+
+
 class EmbedData(BaseModel):
     embedUrl: str = Field(..., description="Complete embed URL")
     embedToken: str = Field(..., description="Unique embed token")
@@ -58,7 +84,38 @@ class EmbedData(BaseModel):
     expiresIn: int = Field(..., description="Time-to-live in seconds")
 
 
-@router.post("/api/embed", tags=["Embed"], summary="Create Embed URL", response_model=EmbedResponse)
+def _expires_in(request: EmbedRequest) -> int:
+    return (request.expiresInDays or 1) * 24 * 60 * 60
+
+
+async def _new_embed(request: EmbedRequest) -> dict:
+    cypher = request.cypherQuery.strip()
+    return {
+        "embed_token": str(uuid4()),
+        "cypher_query": cypher,
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=_expires_in(request)),
+        "snapshot": await capture_snapshot(cypher) if request.snapshot else None,
+    }
+
+
+def _embed_data(embed: dict, request: EmbedRequest) -> dict:
+    base_url = os.environ.get("EMBED_BASE_URL", "http://localhost:8000")
+    token = embed["embed_token"]
+    return {
+        "embedUrl": f"{base_url}/view/{token}",
+        "embedToken": token,
+        "expiresAt": embed["expires_at"].isoformat(),
+        "expiresIn": _expires_in(request),
+    }
+
+
+@router.post(
+    "/api/embed",
+    tags=["Embed"],
+    summary="Create Embed URL",
+    response_model=EmbedResponse,
+    dependencies=[Depends(bind_client)],
+)
 async def create_embed_endpoint(
     request: EmbedRequest, 
     session_gen=Depends(get_session)
@@ -68,30 +125,269 @@ async def create_embed_endpoint(
     
     - **cypherQuery**: Cypher query to execute in the visualization
     - **expiresInDays**: Number of days the embed token will remain valid (default: 1)
+    - **snapshot**: Freeze the graph result now; views never query Neo4j
+      (refresh with `POST /api/embed/{token}/snapshot/refresh`)
     
     Returns an embed URL that can be used to display the graph visualization.
+    With `snapshot`, a query that fails creates no token, and a result over
+    `EMBED_SNAPSHOT_MAX_BYTES` compressed is rejected with 413.
     """
     if not request.cypherQuery or request.cypherQuery.strip() == "":
         raise HTTPException(status_code=400, detail="cypherQuery is required")
 
-    expires_days = request.expiresInDays or 1
-    expires_in = expires_days * 24 * 60 * 60
-    expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+    embed = await _new_embed(request)
+    async with session_gen as session:
+        await crud_create_embed(session, **embed)
+
+    return {"success": True, "data": _embed_data(embed, request)}
 
-    token = str(uuid4())
 
+@router.post(
+    "/api/embed/batch",
+    tags=["Embed"],
+    summary="Create Embed URLs in Bulk",
+    response_model=EmbedBatchResponse,
+    dependencies=[Depends(bind_client)],
+)
+async def create_embed_batch_endpoint(
+    requests: List[EmbedRequest],
+    session_gen=Depends(get_session)
+):
+    """
+    Create many embed URLs in one request.
+
+    The body is a JSON array of `POST /api/embed` request bodies (at most
+    `EMBED_BATCH_MAX_SIZE`). All embeds are written in a single transaction
+    with multi-row INSERTs, so either every token is created or none is.
+    Returns the embed data for each request, in request order.
+    """
+    if not requests:
+        raise HTTPException(status_code=400, detail="At least one embed is required")
+    if len(requests) > settings.EMBED_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.EMBED_BATCH_MAX_SIZE} embeds can be created per request"
+        )
+    for index, request in enumerate(requests):
+        if not request.cypherQuery or request.cypherQuery.strip() == "":
+            raise HTTPException(status_code=400, detail=f"cypherQuery is required (item {index})")
+
+    # Snapshot queries run one after another so a batch holds a single admission slot at a time.
+    embeds = [await _new_embed(request) for request in requests]
     async with session_gen as session:
-        await crud_create_embed(session, embed_token=token, cypher_query=request.cypherQuery.strip(), expires_at=expires_at)
+        await create_embeds(session, embeds)
 
-    base_url = os.environ.get("EMBED_BASE_URL", "http://localhost:8000")
-    embed_url = f"{base_url}/view/{token}"
+    return {"success": True, "data": [_embed_data(embed, request) for embed, request in zip(embeds, requests)]}
 
-    return {
-        "success": True,
-        "data": {
-            "embedUrl": embed_url,
-            "embedToken": token,
-            "expiresAt": expires_at.isoformat(),
-            "expiresIn": expires_in,
-        },
-    }
+
+async def _rows_body_parts(records):
+    # Records arrive encoded (encode=dumps). Fields are ordered so "success" is
+    # written last: a query that fails after the first record still closes the
+    # JSON with success=false and the error.
+    try:
+        yield b'{"data":['
+        separator = b""
+        try:
+            async for record in records:
+                yield separator + record
+                separator = b","
+        except HTTPException as e:
+            yield b'],"success":false,"error":' + dumps({"message": e.detail}) + b"}"
+            return
+        except ResultTruncated:
+            yield b'],"truncated":true,"success":true}'
+            return
+        yield b'],"success":true}'
+    finally:
+        await records.aclose()
+
+
+async def _live_embed(session_gen, token: str):
+    async with session_gen as session:
+        embed_record = await find_by_token(session, token)
+    if not embed_record:
+        raise HTTPException(status_code=404, detail="Token not found")
+    if embed_record.expires_at < datetime.now(timezone.utc):
+        raise HTTPException(status_code=410, detail="Token expired")
+    return embed_record
+
+
+def _snapshot_id(embed_record):
+    return embed_record.id if embed_record.snapshot else None
+
+
+@router.get(
+    "/api/embed/{token}/graph", tags=["Embed"], summary="Get Embed Graph", dependencies=[Depends(bind_client)]
+)
+async def embed_graph_endpoint(
+    token: str,
+    request: Request,
+    format: Literal["rows", "graph"] = "rows",
+    layout: bool = False,
+    session_gen=Depends(get_session)
+):
+    """
+    Resolve an embed token and run its stored Cypher query in one request.
+
+    - **token**: The embed token
+    - **format**: `rows` (default) or `graph` for deduplicated `{nodes, relationships}`
+    - **layout**: With `format=graph`, add server-computed `x`/`y` to each node
+      (cached per query) so the client can render with physics off
+
+    Returns the same `{success, data, error}` shape as `/api/proxy/query`.
+    Graph results larger than `EMBED_SUMMARY_NODE_BUDGET` nodes are collapsed
+    into cluster nodes; see `/api/embed/{token}/graph/clusters/{cluster}`.
+    Results are served from the embed result cache when it is enabled
+    (concurrent viewers of a cold embed share one Neo4j execution);
+    otherwise rows are streamed to the client as records arrive from Neo4j.
+    Snapshot embeds serve `format=graph` from their stored result; `rows`
+    still runs the query.
+    """
+    embed_record = await _live_embed(session_gen, token)
+    cypher = embed_record.cypher_query
+    # A deduplicated graph can only be written once the whole result has been seen.
+    if embed_result_cache.enabled or format == GRAPH:
+        try:
+            body = await cancel_on_disconnect(
+                request,
+                load_embed_result(
+                    cypher,
+                    format,
+                    layout_key=embed_record.query_hash if layout else None,
+                    snapshot_id=_snapshot_id(embed_record),
+                ),
+            )
+        except AdmissionRejected:
+            raise
+        except HTTPException as e:
+            return {"success": False, "error": {"message": e.detail}}
+        return Response(body, media_type="application/json")
+
+    try:
+        records = await open_cypher_stream(cypher, {}, encode=dumps)
+    except AdmissionRejected:
+        raise
+    except HTTPException as e:
+        return {"success": False, "error": {"message": e.detail}}
+    return StreamingResponse(coalesce_chunks(_rows_body_parts(records)), media_type="application/json")
+
+
+@router.get(
+    "/api/embed/{token}/graph/clusters/{cluster}",
+    tags=["Embed"],
+    summary="Drill Into Embed Cluster",
+    dependencies=[Depends(bind_client)],
+)
+async def embed_cluster_endpoint(
+    token: str,
+    cluster: str,
+    request: Request,
+    layout: bool = False,
+    session_gen=Depends(get_session)
+):
+    """
+    Expand one cluster of a summarized embed graph.
+
+    - **token**: The embed token
+    - **cluster**: A cluster id from a coarse graph (`cluster.id`, e.g. `c3`
+      or, for nested clusters, `c3.c0`)
+    - **layout**: Add server-computed `x`/`y` to each node
+
+    Returns the cluster's nodes and the relationships between them in graph
+    format, itself summarized again if it is still above the node budget.
+    """
+    embed_record = await _live_embed(session_gen, token)
+    layout_key = embed_record.query_hash if layout else None
+    try:
+        body = await cancel_on_disconnect(
+            request,
+            load_embed_result(
+                embed_record.cypher_query,
+                GRAPH,
+                layout_key=layout_key,
+                cluster=cluster,
+                snapshot_id=_snapshot_id(embed_record),
+            ),
+        )
+    except HTTPException as e:
+        if e.status_code == 404 or isinstance(e, AdmissionRejected):
+            raise
+        return {"success": False, "error": {"message": e.detail}}
+    return Response(body, media_type="application/json")
+
+
+@router.post(
+    "/api/embed/{token}/snapshot/refresh",
+    tags=["Embed"],
+    summary="Refresh Embed Snapshot",
+    dependencies=[Depends(bind_client)],
+)
+async def refresh_snapshot_endpoint(token: str, session_gen=Depends(get_session)):
+    """
+    Re-run a snapshot embed's query and replace its stored result.
+
+    - **token**: The embed token (created with `snapshot: true`, otherwise 409)
+
+    Returns `{refreshedAt, size}` (uncompressed bytes). Cached results on
+    this worker are dropped immediately; other workers pick up the new
+    snapshot once their cached copy expires (`EMBED_RESULT_CACHE_TTL_SECONDS`).
+    """
+    embed_record = await _live_embed(session_gen, token)
+    if not embed_record.snapshot:
+        raise HTTPException(status_code=409, detail="Embed is not a snapshot")
+    snapshot = await capture_snapshot(embed_record.cypher_query)
+    async with get_session() as session:
+        refreshed_at = await replace_snapshot(session, embed_record.id, snapshot.body, snapshot.size)
+    invalidate_snapshot_results(embed_record.id)
+    bootstrap_page_cache.invalidate(token)
+    return {"success": True, "data": {"refreshedAt": refreshed_at.isoformat(), "size": snapshot.size}}
+
+
+# Rendered bootstrap pages, reused for as long as the inlined result is cached.
+bootstrap_page_cache = TTLCache(
+    max_size=settings.EMBED_RESULT_CACHE_MAX_ENTRIES,
+    ttl=settings.EMBED_RESULT_CACHE_TTL_SECONDS,
+    max_weight=settings.EMBED_PAGE_CACHE_MAX_BYTES,
+    weigh=lambda page: page.size,
+)
+_bootstrap_flight = SingleFlight()
+
+
+def _build_page(bootstrap: bytes) -> PrecompressedAsset:
+    # "<" only occurs inside JSON strings, where \u003c is equivalent and cannot close the script tag.
+    script = (
+        b'<script id="embed-bootstrap" type="application/json">'
+        + bootstrap.replace(b"<", b"\\u003c")
+        + b"</script>\n"
+    )
+    template, _ = public_assets.get("embed.html").variants["identity"]
+    return PrecompressedAsset(template.replace(b"</head>", script + b"</head>", 1), "text/html", fast=True)
+
+
+async def _render_embed_page(token: str, embed_record) -> PrecompressedAsset:
+    bootstrap = b'{"token":' + dumps(token) + b',"expiresAt":' + dumps(embed_record.expires_at.isoformat())
+    try:
+        result = await load_embed_result(
+            embed_record.cypher_query, GRAPH, layout_key=embed_record.query_hash, snapshot_id=_snapshot_id(embed_record)
+        )
+    except HTTPException:
+        # The page falls back to fetching the graph itself and reports the error.
+        result = None
+    if result is not None and len(result) <= settings.EMBED_BOOTSTRAP_MAX_BYTES:
+        bootstrap += b',"result":' + result
+    bootstrap += b"}"
+    # Compressing and hashing a page of up to EMBED_BOOTSTRAP_MAX_BYTES would block the event loop.
+    page = await asyncio.to_thread(_build_page, bootstrap)
+    if result is not None:
+        bootstrap_page_cache.set(token, page, expires_at=embed_record.expires_at)
+    return page
+
+
+async def render_embed_page(token: str, embed_record) -> PrecompressedAsset:
+    """
+    embed.html with the token metadata and the graph result inlined as a JSON
+    bootstrap block, so the page can render without further requests.
+    """
+    found, page = bootstrap_page_cache.lookup(token)
+    if found:
+        return page
+    return await _bootstrap_flight.do(token, lambda: _render_embed_page(token, embed_record))
@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+from app.db.crud import negative_token_cache, token_cache
+from app.db.reaper import reaper
+from app.db.session import pool_stats as postgres_pool_stats
+from app.services.admission import admission
+from app.services.layout import layout_cache
+from app.services.neo4j_service import pool_stats, query_flight, routing_stats
+from app.services.result_cache import embed_graph_cache, embed_result_cache
+
+router = APIRouter()
+
+
+@router.get("/api/metrics", tags=["Health"], summary="Runtime Metrics")
+async def metrics_endpoint():
+    """
+    Report in-process cache and pool counters for this worker.
+
+    Counters are per process; aggregate across workers when running more than one.
+    """
+    return {
+        "success": True,
+        "data": {
+            "tokenCache": token_cache.stats(),
+            "negativeTokenCache": negative_token_cache.stats(),
+            "embedResultCache": embed_result_cache.stats(),
+            "embedGraphCache": embed_graph_cache.stats(),
+            "layoutCache": layout_cache.stats(),
+            "proxyCoalescing": query_flight.stats(),
+            "admission": admission.stats(),
+            "neo4jPool": pool_stats(),
+            "neo4jRouting": routing_stats(),
+            "postgresPool": postgres_pool_stats(),
+            "reaper": reaper.stats(),
+        },
+    }
@@ -1,9 +1,21 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
-from app.services import run_cypher
+from typing import Optional, Dict, Any, Literal, Union
+from neo4j import READ_ACCESS, WRITE_ACCESS
+from app.config import settings
+from app.services import open_cypher_stream, run_cypher_coalesced
+from app.services.admission import AdmissionRejected, bind_client
+from app.services.cancellation import cancel_on_disconnect
+from app.services.columnar import available_media_types, encode_columnar, requested_media_type
+from app.services.limits import ResultTruncated, is_truncated
+from app.services.pagination import decode_cursor, page_query, split_page
+from app.services.serialization import coalesce_chunks, dumps
 
-router = APIRouter()
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+router = APIRouter(dependencies=[Depends(bind_client)])
 
 
 class ProxyQueryRequest(BaseModel):
@@ -17,20 +29,58 @@ class ProxyQueryRequest(BaseModel):
         description="Query parameters",
         example={}
     )
+    stream: bool = Field(
+        False,
+        description="Stream records as NDJSON (one JSON object per line) instead of a single JSON body",
+        example=False
+    )
+    format: Literal["rows", "graph"] = Field(
+        "rows",
+        description="`rows`: one object per record; `graph`: deduplicated `{nodes, relationships}` keyed by element id",
+        example="rows"
+    )
+    accessMode: Optional[Literal["read", "write"]] = Field(
+        None,
+        description="Declare the query as read or write; detected automatically when omitted",
+        example=None
+    )
+    timeout: Optional[float] = Field(
+        None,
+        description="Transaction timeout in seconds (default NEO4J_QUERY_TIMEOUT_SECONDS, capped at NEO4J_MAX_QUERY_TIMEOUT_SECONDS)",
+        gt=0,
+        example=None
+    )
+    pageSize: Optional[int] = Field(
+        None,
+        description="Return at most this many rows and a `nextCursor` for the rest",
+        ge=1,
+        le=settings.PROXY_MAX_PAGE_SIZE,
+        example=None
+    )
+    cursor: Optional[str] = Field(
+        None,
+        description="`nextCursor` from the previous page of the same query",
+        example=None
+    )
     
     class Config:
         schema_extra = {
             "example": {
                 "cypher": "MATCH (p:Person)-[r:ACTED_IN]->(m:Movie) RETURN p,r,m LIMIT 25",
-                "params": {}
+                "params": {},
+                "stream": False,
+                "format": "rows",
+                "accessMode": "read"
             }
         }
 
 
 class ProxyQueryResponse(BaseModel):
     success: bool = Field(..., description="Success status")
-    data: Optional[list] = Field(None, description="Query results")
+    data: Optional[Union[list, dict]] = Field(None, description="Query results (a list of rows, or `{nodes, relationships}`)")
     error: Optional[dict] = Field(None, description="Error information")
+    nextCursor: Optional[str] = Field(None, description="Cursor for the next page; null on the last page")
+    truncated: Optional[bool] = Field(None, description="True when RESULT_MAX_ROWS / RESULT_MAX_BYTES cut the result short")
     
     class Config:
         schema_extra = {
@@ -61,21 +111,105 @@ class ProxyQueryResponse(BaseModel):
         }
 
 
+async def _ndjson_parts(records):
+    # Records arrive encoded (encode=dumps). A failure after streaming has
+    # started is reported as a final error line.
+    try:
+        async for record in records:
+            yield record + b"\n"
+    except HTTPException as e:
+        yield dumps({"error": {"message": e.detail}}) + b"\n"
+    except ResultTruncated:
+        yield dumps({"truncated": True}) + b"\n"
+    finally:
+        await records.aclose()
+
+
 @router.post("/api/proxy/query", tags=["Proxy"], summary="Execute Neo4j Query", response_model=ProxyQueryResponse)
-async def proxy_query_endpoint(request: ProxyQueryRequest):
+async def proxy_query_endpoint(request: ProxyQueryRequest, http_request: Request):
     """
     Execute a Cypher query against Neo4j database.
     
     - **cypher**: Cypher query to execute
     - **params**: Optional parameters for the query
+    - **stream**: Stream records as NDJSON (also selected by `Accept: application/x-ndjson`)
+    - **format**: `rows` (default) or `graph` for deduplicated nodes and relationships
+    - **accessMode**: `read` or `write`; read queries are routed to followers/read replicas
+    - **timeout**: Transaction timeout in seconds; a query over it fails with 504
+    - **pageSize** / **cursor**: Fetch rows page by page; the final RETURN is
+      rewritten with SKIP/LIMIT, so add an ORDER BY for stable pages
+
+    Row results can also be requested column-wise with `Accept:
+    application/vnd.apache.arrow.stream` (Arrow IPC) or `Accept:
+    application/msgpack`, when pyarrow / msgpack are installed.
     
-    Returns the query results in JSON format.
+    Returns the query results in JSON format. Identical read-only queries
+    that are in flight at the same time share a single Neo4j execution.
+    Queries over the admission limits get 429 (this client) or 503 (server
+    busy) with `Retry-After`. If the client disconnects, its query is cancelled.
+    The body is encoded directly with orjson; `response_model` only documents it.
     """
     if not request.cypher or request.cypher.strip() == "":
         raise HTTPException(status_code=400, detail="cypher is required")
 
+    access_mode = {"read": READ_ACCESS, "write": WRITE_ACCESS}.get(request.accessMode)
+    accept = http_request.headers.get("accept", "")
+    cypher, params = request.cypher, request.params or {}
+
+    paginated = request.pageSize is not None or request.cursor is not None
+    if paginated:
+        if request.stream or request.format != "rows" or NDJSON_MEDIA_TYPE in accept:
+            raise HTTPException(status_code=400, detail="pageSize and cursor are only supported for non-streamed rows")
+        offset = decode_cursor(request.cursor, request.cypher, params) if request.cursor else 0
+        page_size = request.pageSize or settings.PROXY_DEFAULT_PAGE_SIZE
+        cypher, params = page_query(request.cypher, params, offset, page_size)
+
+    columnar_type = requested_media_type(accept)
+    if columnar_type is not None:
+        if columnar_type not in available_media_types():
+            raise HTTPException(status_code=406, detail=f"{columnar_type} is not available on this server")
+        if request.format != "rows" or request.stream:
+            raise HTTPException(status_code=406, detail=f"{columnar_type} is only available for non-streamed rows")
+        try:
+            result = await cancel_on_disconnect(
+                http_request, run_cypher_coalesced(cypher, params, request.format, access_mode, request.timeout)
+            )
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            return {"success": False, "error": {"message": str(e)}}
+        headers = {"X-Result-Truncated": "true"} if is_truncated(result) else {}
+        if paginated:
+            result, next_cursor = split_page(result, request.cypher, request.params or {}, offset, page_size)
+            if next_cursor is not None:
+                headers["X-Next-Cursor"] = next_cursor
+        body = await asyncio.to_thread(encode_columnar, result, columnar_type, settings.PROXY_COLUMNAR_BATCH_ROWS)
+        return Response(body, media_type=columnar_type, headers=headers)
+
+    if request.stream or NDJSON_MEDIA_TYPE in accept:
+        try:
+            records = await open_cypher_stream(
+                cypher, params, request.format, access_mode, request.timeout, encode=dumps
+            )
+        except AdmissionRejected:
+            raise
+        except HTTPException as e:
+            return {"success": False, "error": {"message": e.detail}}
+        return StreamingResponse(coalesce_chunks(_ndjson_parts(records)), media_type=NDJSON_MEDIA_TYPE)
+
     try:
-        result = await run_cypher(request.cypher, request.params or {})
-        return {"success": True, "data": result}
+        result = await cancel_on_disconnect(
+            http_request, run_cypher_coalesced(cypher, params, request.format, access_mode, request.timeout)
+        )
+        payload = {"success": True, "data": result}
+        if is_truncated(result):
+            payload["truncated"] = True
+        if paginated:
+            payload["data"], payload["nextCursor"] = split_page(
+                result, request.cypher, request.params or {}, offset, page_size
+            )
+        return Response(dumps(payload), media_type="application/json")
+    except AdmissionRejected:
+        raise
     except Exception as e:
         return {"success": False, "error": {"message": str(e)}}
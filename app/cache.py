@@ -0,0 +1,114 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Bounded in-process LRU cache with a per-entry time-to-live.
+
+    Entries are evicted least-recently-used first once ``max_size`` entries
+    (or, when ``weigh`` is given, ``max_weight`` total weight) are exceeded,
+    and are dropped lazily when read after their deadline. Not thread-safe;
+    it is meant to be used from the event loop only.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        max_weight: Optional[int] = None,
+        weigh: Optional[Callable[[Any], int]] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self._weigh = weigh
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.lookup(key, count=False)[0]
+
+    def _remove(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._weight -= entry[2]
+        return True
+
+    def lookup(self, key: Hashable, count: bool = True) -> Tuple[bool, Any]:
+        """Return ``(found, value)`` so cached ``None`` values can be told apart from misses."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            deadline, value, _ = entry
+            if deadline > time.monotonic():
+                self._entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return True, value
+            self._remove(key)
+            self.expirations += 1
+        if count:
+            self.misses += 1
+        return False, None
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        found, value = self.lookup(key)
+        return value if found else default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, expires_at: Optional[datetime] = None):
+        """Store ``value``; ``expires_at`` caps the TTL so entries never outlive the data they mirror."""
+        self._remove(key)
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.now(timezone.utc)).total_seconds())
+        weight = self._weigh(value) if self._weigh else 0
+        if ttl <= 0 or (self.max_weight is not None and weight > self.max_weight):
+            return
+        self._entries[key] = (time.monotonic() + ttl, value, weight)
+        self._weight += weight
+        while len(self._entries) > self.max_size or (
+            self.max_weight is not None and self._weight > self.max_weight
+        ):
+            _, (_, _, evicted_weight) = self._entries.popitem(last=False)
+            self._weight -= evicted_weight
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        return self._remove(key)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches ``predicate``; returns how many were dropped."""
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._weight = 0
+
+    def stats(self) -> dict:
+        stats = {
+            "size": len(self._entries),
+            "maxSize": self.max_size,
+            "ttlSeconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+        if self._weigh is not None:
+            stats["weight"] = self._weight
+            stats["maxWeight"] = self.max_weight
+        return stats
@@ -15,18 +15,120 @@ class Settings(BaseSettings):
     NEO4J_USER: str
     NEO4J_PASSWORD: str
     NEO4J_DATABASE: str = "neo4j"
+    NEO4J_MAX_CONNECTION_POOL_SIZE: int = 100
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = 60.0
+    NEO4J_MAX_CONNECTION_LIFETIME: float = 3600.0
+    NEO4J_KEEP_ALIVE: bool = True
+    NEO4J_FETCH_SIZE: int = 1000
+    # Transaction timeout for queries (0 = none) and the most a proxy request may ask for (0 = no cap)
+    NEO4J_QUERY_TIMEOUT_SECONDS: float = 30.0
+    NEO4J_MAX_QUERY_TIMEOUT_SECONDS: float = 300.0
+    # Connections opened at startup so the first requests skip the handshake
+    NEO4J_WARMUP_CONNECTIONS: int = 4
+    # Send read-only queries to followers/read replicas (READ access mode)
+    NEO4J_ROUTE_READS: bool = True
+    # Classify ambiguous queries (procedure calls) with a (cached) EXPLAIN
+    NEO4J_EXPLAIN_ROUTING: bool = True
+
+    # Share one execution between concurrent identical read-only proxy queries
+    PROXY_COALESCE_QUERIES: bool = True
+    # Rows per record batch in Arrow / MessagePack proxy responses
+    PROXY_COLUMNAR_BATCH_ROWS: int = 10000
+    # Proxy pagination (pageSize / cursor): page size when only a cursor is sent, and the largest allowed
+    PROXY_DEFAULT_PAGE_SIZE: int = 1000
+    PROXY_MAX_PAGE_SIZE: int = 10000
+
+    # Admission control for Neo4j sessions (0 disables): concurrent slots, queued waiters and how long they wait
+    ADMISSION_MAX_CONCURRENT: int = 64
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    # Queries one client may have running or queued; clients are identified by
+    # ADMISSION_CLIENT_HEADER when set (only behind a proxy that sets it), else the peer address
+    ADMISSION_PER_CLIENT_CONCURRENCY: int = 8
+    ADMISSION_CLIENT_HEADER: str = ""
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
 
     # Postgres
     POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "embeddb"
     DATABASE_URL: Optional[str] = None
+    # "false", "true" or "debug"; SQL echo logs synchronously on every query
+    DB_ECHO: str = "false"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_RECYCLE: int = 1800
+    # asyncpg prepared statement cache per connection (0 disables, e.g. behind pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
 
     # Embed / runtime
     EMBED_BASE_URL: Optional[AnyUrl] = None
     MAX_TOKEN_EXPIRY_DAYS: int = 90
     DEFAULT_TOKEN_EXPIRY_DAYS: int = 7
 
+    # Token lookup cache (in-process, per worker)
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: float = 300.0
+    NEGATIVE_TOKEN_CACHE_MAX_SIZE: int = 50000
+    NEGATIVE_TOKEN_CACHE_TTL_SECONDS: float = 60.0
+
+    # Embed query result cache (serialized payloads, per worker); TTL 0 disables. The raw graphs
+    # behind graph views and rendered /view pages are cached for the same TTL, each within its own
+    # byte budget, so a worker holds at most the sum of the three *_MAX_BYTES
+    EMBED_RESULT_CACHE_TTL_SECONDS: float = 30.0
+    EMBED_RESULT_CACHE_MAX_ENTRIES: int = 256
+    EMBED_RESULT_CACHE_MAX_BYTES: int = 128 * 1024 * 1024
+    EMBED_GRAPH_CACHE_MAX_BYTES: int = 96 * 1024 * 1024
+    EMBED_PAGE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+
+    # Inline token metadata and the graph result into /view pages; larger results are fetched by the page
+    EMBED_INLINE_BOOTSTRAP: bool = True
+    EMBED_BOOTSTRAP_MAX_BYTES: int = 2 * 1024 * 1024
+
+    # Expired token reaper: runs every REAPER_INTERVAL_SECONDS per worker (0 disables), deleting tokens
+    # expired for over REAPER_RETENTION_SECONDS in batches, pausing between batches
+    REAPER_INTERVAL_SECONDS: float = 3600.0
+    REAPER_RETENTION_SECONDS: float = 7 * 24 * 60 * 60
+    REAPER_BATCH_SIZE: int = 1000
+    REAPER_BATCH_PAUSE_SECONDS: float = 0.5
+    REAPER_MAX_BATCHES_PER_RUN: int = 100
+    # Weekly embed_tokens partitions kept ready beyond the current week
+    EMBED_TOKEN_PARTITION_WEEKS_AHEAD: int = 8
+    # Longest partition create/detach waits for its locks before retrying on the next run (0 = no limit)
+    EMBED_TOKEN_PARTITION_LOCK_TIMEOUT_SECONDS: float = 5.0
+
+    # Most embeds accepted by one POST /api/embed/batch request
+    EMBED_BATCH_MAX_SIZE: int = 10000
+
+    # Largest stored embed snapshot (gzip-compressed bytes); larger results are rejected with 413
+    EMBED_SNAPSHOT_MAX_BYTES: int = 16 * 1024 * 1024
+
+    # Graph results above the node budget are collapsed into clusters ("label" or "community"); 0 disables
+    EMBED_SUMMARY_NODE_BUDGET: int = 2000
+    EMBED_SUMMARY_MAX_CLUSTERS: int = 100
+    EMBED_SUMMARY_METHOD: str = "label"
+
+    # Result caps per query (0 = unlimited), enforced while records arrive; results over them are
+    # cut short and flagged "truncated". RESULT_INJECT_LIMIT also adds LIMIT to read-only queries' final RETURN
+    RESULT_MAX_ROWS: int = 100000
+    RESULT_MAX_BYTES: int = 64 * 1024 * 1024
+    RESULT_INJECT_LIMIT: bool = True
+
+    # Server-side graph layout (needs numpy); positioned graphs render with physics off
+    EMBED_SERVER_LAYOUT: bool = True
+    LAYOUT_MAX_NODES: int = 2000
+    LAYOUT_ITERATIONS: int = 60
+    LAYOUT_SPRING_LENGTH: float = 200.0
+    LAYOUT_GRAVITY: float = 1.0
+    LAYOUT_CACHE_MAX_ENTRIES: int = 1024
+    LAYOUT_CACHE_TTL_SECONDS: float = 24 * 60 * 60
+
+    # Static assets (public/*.html are precompressed in memory at startup)
+    STATIC_DIRECTORY: str = "public"
+    STATIC_MAX_AGE: int = 3600
+
     # Logging
     LOG_LEVEL: str = "info"
 
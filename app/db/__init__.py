@@ -1,5 +1,28 @@
 from .session import get_session
-from .models import Base, EmbedToken
-from .crud import create_embed, find_by_token
+from .models import Base, CypherQuery, EmbedSnapshot, EmbedToken
+from .crud import (
+    create_embed,
+    create_embeds,
+    find_by_token,
+    invalidate_token,
+    load_snapshot,
+    replace_snapshot,
+    store_query,
+    token_cache,
+)
 
-__all__ = ["get_session", "Base", "EmbedToken", "create_embed", "find_by_token"]
+__all__ = [
+    "get_session",
+    "Base",
+    "CypherQuery",
+    "EmbedSnapshot",
+    "EmbedToken",
+    "create_embed",
+    "create_embeds",
+    "find_by_token",
+    "invalidate_token",
+    "load_snapshot",
+    "replace_snapshot",
+    "store_query",
+    "token_cache",
+]
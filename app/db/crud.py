@@ -1,32 +1,181 @@
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.models import EmbedToken
+from app.db.models import CypherQuery, EmbedSnapshot, EmbedToken
+from app.services.cypher import normalize_cypher, query_hash
+from app.cache import TTLCache
+from app.config import settings
 import uuid
 from datetime import datetime, timezone
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException
 
+# Embed rows are immutable once written, so live tokens can be served from
+# memory until the cache TTL or the token's own expiry, whichever is first.
+token_cache = TTLCache(max_size=settings.TOKEN_CACHE_MAX_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
 
-async def create_embed(session: AsyncSession, embed_token: str, cypher_query: str, expires_at: datetime):
+# Unknown tokens (cached as None) and expired rows are kept apart from live
+# ones so a flood of bad tokens cannot evict popular embeds.
+negative_token_cache = TTLCache(
+    max_size=settings.NEGATIVE_TOKEN_CACHE_MAX_SIZE, ttl=settings.NEGATIVE_TOKEN_CACHE_TTL_SECONDS
+)
+
+
+def is_well_formed_token(token: str) -> bool:
+    """Tokens are minted as canonical ``str(uuid4())``; anything else can never match a row."""
+    try:
+        return str(uuid.UUID(token)) == token
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+
+async def store_query(session: AsyncSession, cypher_query: str) -> CypherQuery:
+    """The stored row for ``cypher_query``'s normalized text, inserted if new (not committed)."""
+    digest = query_hash(cypher_query)
+    await session.execute(
+        insert(CypherQuery)
+        .values(query_hash=digest, cypher_query=normalize_cypher(cypher_query), created_at=datetime.now(timezone.utc))
+        .on_conflict_do_nothing(index_elements=[CypherQuery.query_hash])
+    )
+    return await session.get(CypherQuery, digest)
+
+
+async def create_embed(
+    session: AsyncSession, embed_token: str, cypher_query: str, expires_at: datetime, snapshot: EmbedSnapshot = None
+):
+    """Insert an embed row; with ``snapshot``, the token and its stored result are written in one transaction."""
     try:
         embed = EmbedToken(
+            id=uuid.uuid4(),
             embed_token=embed_token,
-            cypher_query=cypher_query,
-            expires_at=expires_at
+            query=await store_query(session, cypher_query),
+            expires_at=expires_at,
+            snapshot=snapshot is not None,
         )
         session.add(embed)
+        if snapshot is not None:
+            snapshot.embed_token_id = embed.id
+            session.add(snapshot)
         await session.commit()
-        return embed
     except SQLAlchemyError as e:
         await session.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    negative_token_cache.invalidate(embed_token)
+    token_cache.set(embed_token, embed, expires_at=expires_at)
+    return embed
 
 
 async def find_by_token(session: AsyncSession, token: str):
+    if not is_well_formed_token(token):
+        return None
+    found, embed = token_cache.lookup(token)
+    if found:
+        return embed
+    found, embed = negative_token_cache.lookup(token)
+    if found:
+        return embed
     try:
         result = await session.execute(
             select(EmbedToken).where(EmbedToken.embed_token == token)
         )
+        embed = result.scalar_one_or_none()
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if embed is None or embed.expires_at < datetime.now(timezone.utc):
+        negative_token_cache.set(token, embed)
+    else:
+        token_cache.set(token, embed, expires_at=embed.expires_at)
+    return embed
+
+
+# Rows per multi-row INSERT, keeping each statement well under the 32767 bind-parameter limit.
+_INSERT_CHUNK_ROWS = 1000
+
+
+def _chunks(rows: list):
+    for start in range(0, len(rows), _INSERT_CHUNK_ROWS):
+        yield rows[start:start + _INSERT_CHUNK_ROWS]
+
+
+async def create_embeds(session: AsyncSession, embeds: list):
+    """Insert many embeds in one transaction using multi-row INSERTs.
+
+    ``embeds`` are dicts with ``embed_token``, ``cypher_query``,
+    ``expires_at`` and an optional unsaved ``snapshot``. Unlike
+    ``create_embed`` the new rows are not put in the token cache, so a large
+    batch cannot evict the embeds that are actually being viewed.
+    """
+    now = datetime.now(timezone.utc)
+    queries, token_rows, snapshot_rows = {}, [], []
+    for embed in embeds:
+        digest = query_hash(embed["cypher_query"])
+        queries.setdefault(digest, normalize_cypher(embed["cypher_query"]))
+        embed_id = uuid.uuid4()
+        snapshot = embed.get("snapshot")
+        token_rows.append({
+            "id": embed_id,
+            "embed_token": embed["embed_token"],
+            "query_hash": digest,
+            "expires_at": embed["expires_at"],
+            "created_at": now,
+            "snapshot": snapshot is not None,
+        })
+        if snapshot is not None:
+            snapshot_rows.append({
+                "embed_token_id": embed_id,
+                "result_format": snapshot.result_format,
+                "content_encoding": snapshot.content_encoding,
+                "body": snapshot.body,
+                "size": snapshot.size,
+                "refreshed_at": now,
+            })
+    query_rows = [{"query_hash": digest, "cypher_query": text, "created_at": now} for digest, text in queries.items()]
+    try:
+        for chunk in _chunks(query_rows):
+            await session.execute(
+                insert(CypherQuery).values(chunk).on_conflict_do_nothing(index_elements=[CypherQuery.query_hash])
+            )
+        for chunk in _chunks(token_rows):
+            await session.execute(insert(EmbedToken).values(chunk))
+        for chunk in _chunks(snapshot_rows):
+            await session.execute(insert(EmbedSnapshot).values(chunk))
+        await session.commit()
+    except SQLAlchemyError as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    for embed in embeds:
+        negative_token_cache.invalidate(embed["embed_token"])
+
+
+async def load_snapshot(session: AsyncSession, embed_token_id: uuid.UUID):
+    try:
+        result = await session.execute(
+            select(EmbedSnapshot).where(EmbedSnapshot.embed_token_id == embed_token_id)
+        )
         return result.scalar_one_or_none()
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+async def replace_snapshot(session: AsyncSession, embed_token_id: uuid.UUID, body: bytes, size: int) -> datetime:
+    """Overwrite a stored snapshot with a freshly captured result; returns its new ``refreshed_at``."""
+    refreshed_at = datetime.now(timezone.utc)
+    try:
+        result = await session.execute(
+            update(EmbedSnapshot)
+            .where(EmbedSnapshot.embed_token_id == embed_token_id)
+            .values(body=body, size=size, refreshed_at=refreshed_at)
+        )
+        await session.commit()
+    except SQLAlchemyError as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return refreshed_at
+
+
+def invalidate_token(token: str):
+    """Drop any cached lookup for ``token`` (call after changing or deleting its row)."""
+    token_cache.invalidate(token)
+    negative_token_cache.invalidate(token)
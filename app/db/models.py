@@ -1,17 +1,55 @@
-from sqlalchemy import Column, String, Text, TIMESTAMP
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, LargeBinary, String, Text, TIMESTAMP, false
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
 import datetime
 import uuid
 
 Base = declarative_base()
 
 
+class CypherQuery(Base):
+    """A normalized Cypher query, stored once however many tokens embed it."""
+
+    __tablename__ = "cypher_queries"
+
+    query_hash = Column(String(64), primary_key=True)
+    cypher_query = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.datetime.utcnow)
+
+
 class EmbedToken(Base):
     __tablename__ = "embed_tokens"
+    # Weekly range partitions, created and dropped by app.db.partitions. Keys
+    # must include the partition column, so expires_at is part of the primary
+    # key and embed_token (a random UUID) is indexed rather than unique.
+    __table_args__ = {"postgresql_partition_by": "RANGE (expires_at)"}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    embed_token = Column(String, unique=True, nullable=False)
-    cypher_query = Column(Text, nullable=False)
-    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    embed_token = Column(String, nullable=False, index=True)
+    query_hash = Column(String(64), ForeignKey("cypher_queries.query_hash"), nullable=False, index=True)
+    expires_at = Column(TIMESTAMP(timezone=True), primary_key=True, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.datetime.utcnow)
+    # Views are served from the row in embed_snapshots instead of running the query.
+    snapshot = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    # Joined eagerly: token rows are cached and used after their session has closed.
+    query = relationship(CypherQuery, lazy="joined")
+
+    @property
+    def cypher_query(self) -> str:
+        return self.query.cypher_query
+
+
+class EmbedSnapshot(Base):
+    __tablename__ = "embed_snapshots"
+
+    # No foreign key: embed_tokens partitions are dropped wholesale, and their
+    # snapshots are deleted alongside (app.db.partitions, app.db.reaper).
+    embed_token_id = Column(UUID(as_uuid=True), primary_key=True)
+    result_format = Column(String, nullable=False)
+    content_encoding = Column(String, nullable=False)
+    # Serialized query result, compressed with content_encoding
+    body = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    refreshed_at = Column(TIMESTAMP(timezone=True), nullable=False, default=datetime.datetime.utcnow)
@@ -0,0 +1,176 @@
+"""Weekly range partitions of ``embed_tokens`` by ``expires_at``.
+
+Partitions are named ``embed_tokens_pYYYYMMDD`` after the Monday (UTC) their
+week starts on. Rows outside every weekly partition land in
+``embed_tokens_default``; creating a partition moves its week's rows out of
+it first. Expiry detaches and drops whole weekly partitions; expired rows in
+the default partition are still deleted in batches by the reaper.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import column, table, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+PARENT = "embed_tokens"
+DEFAULT_PARTITION = f"{PARENT}_default"
+WEEK = timedelta(days=7)
+
+# For batched deletes from the default partition alone.
+default_partition = table(DEFAULT_PARTITION, column("id"), column("expires_at"))
+
+# SQLSTATE lock_not_available, raised when lock_timeout expires.
+_LOCK_NOT_AVAILABLE = "55P03"
+
+# Any fixed key: only one worker maintains partitions at a time.
+_LOCK_KEY = 0x656D6264
+
+IS_PARTITIONED = text(
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:parent))"
+)
+LIST_PARTITIONS = text(
+    "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+    "WHERE i.inhparent = to_regclass(:parent)"
+)
+
+
+def week_start(moment: datetime) -> datetime:
+    day = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=day.weekday())
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARENT}_p{start:%Y%m%d}"
+
+
+def partition_start(name: str) -> Optional[datetime]:
+    prefix = f"{PARENT}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        start = datetime.strptime(name[len(prefix):], "%Y%m%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    # strptime also takes unpadded fields ("2026011"); only names this module generates count.
+    return start if partition_name(start) == name else None
+
+
+def create_partition_statements(start: datetime) -> List[str]:
+    """SQL creating the partition for the week from ``start``, taking over its rows from the default partition.
+
+    A partition cannot be created directly while the default partition holds
+    rows in its range, so the table is built standalone, filled, then attached.
+    """
+    name, low, high = partition_name(start), start.isoformat(), (start + WEEK).isoformat()
+    return [
+        f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS)",
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE expires_at >= '{low}' AND expires_at < '{high}' "
+        f"RETURNING *) INSERT INTO {name} SELECT * FROM moved",
+        f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ('{low}') TO ('{high}')",
+    ]
+
+
+def drop_partition_statements(name: str) -> List[List[str]]:
+    """SQL dropping partition ``name``, as a list of transactions.
+
+    Its tokens' snapshots go first: embed_snapshots has no foreign key to
+    the partitioned table. Dropping an attached partition would hold an
+    ACCESS EXCLUSIVE lock on ``embed_tokens`` for the whole drop, so the
+    partition is detached first and dropped as a standalone table.
+    ``DETACH ... CONCURRENTLY`` is not allowed while a default partition
+    exists, so the detach runs under ``lock_timeout`` instead.
+    """
+    return [
+        [f"DELETE FROM embed_snapshots WHERE embed_token_id IN (SELECT id FROM {name})"],
+        [f"ALTER TABLE {PARENT} DETACH PARTITION {name}", f"DROP TABLE {name}"],
+    ]
+
+
+def plan(existing: List[str], now: datetime, weeks_ahead: int, retention: float):
+    """``(starts to create, names to drop)``: the current and next ``weeks_ahead`` weeks must exist;
+    weeks that ended more than ``retention`` seconds ago are dropped."""
+    present = {partition_start(name) for name in existing} - {None}
+    current = week_start(now)
+    create = [current + WEEK * i for i in range(weeks_ahead + 1) if current + WEEK * i not in present]
+    cutoff = now - timedelta(seconds=retention)
+    drop = sorted(
+        name for name in existing if partition_start(name) is not None and partition_start(name) + WEEK <= cutoff
+    )
+    return create, drop
+
+
+async def is_partitioned(connection: AsyncConnection) -> bool:
+    return bool((await connection.execute(IS_PARTITIONED, {"parent": PARENT})).scalar())
+
+
+def _lock_not_available(error: DBAPIError) -> bool:
+    return getattr(error.orig, "pgcode", None) == _LOCK_NOT_AVAILABLE
+
+
+async def _run_locked(connection: AsyncConnection, statements: List[str], lock_timeout: float):
+    """Run ``statements`` in one transaction that gives up waiting for locks after ``lock_timeout`` seconds.
+
+    A DDL statement queued behind a long query would block every query on
+    ``embed_tokens`` that arrives after it; failing fast and retrying on the
+    next run is cheaper.
+    """
+    if lock_timeout > 0:
+        await connection.exec_driver_sql(f"SET LOCAL lock_timeout = {int(lock_timeout * 1000)}")
+    for statement in statements:
+        await connection.exec_driver_sql(statement)
+    await connection.commit()
+
+
+async def maintain_partitions(
+    connection: AsyncConnection, weeks_ahead: int, retention: float, lock_timeout: float = 0
+) -> Optional[dict]:
+    """Create upcoming weekly partitions and drop expired ones, one committed step at a time.
+
+    Returns ``{created, dropped, reclaimed, skipped}`` (partition names,
+    rows dropped, and partitions whose locks were not granted within
+    ``lock_timeout`` seconds), or None when another worker holds the
+    maintenance lock.
+    """
+    if not (await connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _LOCK_KEY})).scalar():
+        await connection.commit()
+        return None
+    try:
+        existing = (await connection.execute(LIST_PARTITIONS, {"parent": PARENT})).scalars().all()
+        create, drop = plan(existing, datetime.now(timezone.utc), weeks_ahead, retention)
+        await connection.commit()
+        created, dropped, skipped, reclaimed = [], [], [], 0
+        # exec_driver_sql: the timestamp literals' colons would read as bind parameters in text().
+        for start in create:
+            try:
+                await _run_locked(connection, create_partition_statements(start), lock_timeout)
+            except DBAPIError as e:
+                if not _lock_not_available(e):
+                    raise
+                await connection.rollback()
+                skipped.append(partition_name(start))
+                continue
+            created.append(partition_name(start))
+        for name in drop:
+            rows = (await connection.exec_driver_sql(f"SELECT count(*) FROM {name}")).scalar()
+            try:
+                for statements in drop_partition_statements(name):
+                    await _run_locked(connection, statements, lock_timeout)
+            except DBAPIError as e:
+                if not _lock_not_available(e):
+                    raise
+                await connection.rollback()
+                skipped.append(name)
+                continue
+            dropped.append(name)
+            reclaimed += rows
+        if skipped:
+            logger.warning("Lock timeout maintaining partitions %s; retrying on the next run", skipped)
+        return {"created": created, "dropped": dropped, "reclaimed": reclaimed, "skipped": skipped}
+    finally:
+        await connection.rollback()
+        await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _LOCK_KEY})
+        await connection.commit()
@@ -0,0 +1,184 @@
+"""Delete expired embed tokens.
+
+When ``embed_tokens`` is partitioned, expired weekly partitions are dropped
+and upcoming ones created, and expired rows left in the default partition
+are deleted in bounded batches; otherwise all expired rows are deleted in
+batches. Runs in the background of each worker when
+``REAPER_INTERVAL_SECONDS`` > 0, or once from the command line::
+
+    python -m app.db.reaper [--batch-size N] [--max-batches N]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import TableClause
+
+from app.config import settings
+from app.db.models import EmbedSnapshot, EmbedToken
+from app.db.partitions import default_partition, is_partitioned, maintain_partitions
+from app.db.session import engine, get_session
+
+logger = logging.getLogger(__name__)
+
+
+async def delete_expired_batch(
+    session: AsyncSession, cutoff: datetime, batch_size: int, tokens: TableClause = EmbedToken.__table__
+) -> int:
+    """Delete up to ``batch_size`` tokens in ``tokens`` that expired before ``cutoff``; returns how many were deleted.
+
+    Rows are picked with ``FOR UPDATE SKIP LOCKED`` so reapers on several
+    workers split the work instead of waiting on each other. The tokens'
+    snapshots are deleted in the same transaction.
+    """
+    expired = (
+        select(tokens.c.id)
+        .where(tokens.c.expires_at < cutoff)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        delete(tokens).where(tokens.c.id.in_(expired.scalar_subquery())).returning(tokens.c.id)
+    )
+    deleted = result.scalars().all()
+    if deleted:
+        await session.execute(delete(EmbedSnapshot).where(EmbedSnapshot.embed_token_id.in_(deleted)))
+    await session.commit()
+    return len(deleted)
+
+
+class Reaper:
+    """Expired-token cleanup: batches of ``batch_size``, ``pause`` seconds apart, at most ``max_batches`` per run.
+
+    Each batch is its own short transaction, so row locks and WAL bursts
+    stay small; the pause leaves I/O headroom for the serving path. Tokens
+    are kept for ``retention`` seconds past expiry so they still answer 410
+    rather than 404 for a while. On a partitioned table a week's partition
+    is dropped once all of it is past retention, ``weeks_ahead`` future
+    partitions are kept ready, and only the default partition, which is
+    never dropped, is cleaned in batches. Partition DDL waits at most
+    ``lock_timeout`` seconds for its locks.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        pause: float,
+        max_batches: int,
+        retention: float,
+        weeks_ahead: int = 8,
+        lock_timeout: float = 5.0,
+    ):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.max_batches = max_batches
+        self.retention = retention
+        self.weeks_ahead = weeks_ahead
+        self.lock_timeout = lock_timeout
+        self._runs = 0
+        self._reclaimed = 0
+        self._failures = 0
+        self._last_run = None
+
+    async def run_once(self) -> int:
+        """Reclaim expired tokens; returns how many rows were deleted."""
+        started = time.monotonic()
+        async with engine.connect() as connection:
+            partitioned = await is_partitioned(connection)
+            partitions = None
+            if partitioned:
+                partitions = await maintain_partitions(
+                    connection, self.weeks_ahead, self.retention, self.lock_timeout
+                )
+        reclaimed, batches = await self._delete_batches(default_partition if partitioned else EmbedToken.__table__)
+        logger.info("Reaped %d expired embed tokens in %d batches", reclaimed, batches)
+        details = {"batches": batches}
+        if partitions is not None:
+            reclaimed += partitions["reclaimed"]
+            details["partitions"] = partitions
+            logger.info(
+                "Dropped expired embed token partitions %s (%d rows); created %s",
+                partitions["dropped"], partitions["reclaimed"], partitions["created"],
+            )
+        self._record(reclaimed, time.monotonic() - started, **details)
+        return reclaimed
+
+    def _record(self, reclaimed: int, seconds: float, **details):
+        self._runs += 1
+        self._reclaimed += reclaimed
+        self._last_run = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "reclaimed": reclaimed,
+            "seconds": round(seconds, 3),
+            **details,
+        }
+
+    async def _delete_batches(self, tokens: TableClause) -> tuple:
+        """Delete expired rows from ``tokens`` until none are left or ``max_batches`` is reached;
+        returns ``(rows deleted, batches)``."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention)
+        reclaimed = batches = 0
+        while self.max_batches <= 0 or batches < self.max_batches:
+            async with get_session() as session:
+                deleted = await delete_expired_batch(session, cutoff, self.batch_size, tokens)
+            reclaimed += deleted
+            batches += 1
+            if deleted < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+        return reclaimed, batches
+
+    async def run_forever(self, interval: float):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self._failures += 1
+                logger.warning("Expired token reaping failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        return {
+            "runs": self._runs,
+            "reclaimed": self._reclaimed,
+            "failures": self._failures,
+            "lastRun": self._last_run,
+        }
+
+
+reaper = Reaper(
+    batch_size=settings.REAPER_BATCH_SIZE,
+    pause=settings.REAPER_BATCH_PAUSE_SECONDS,
+    max_batches=settings.REAPER_MAX_BATCHES_PER_RUN,
+    retention=settings.REAPER_RETENTION_SECONDS,
+    weeks_ahead=settings.EMBED_TOKEN_PARTITION_WEEKS_AHEAD,
+    lock_timeout=settings.EMBED_TOKEN_PARTITION_LOCK_TIMEOUT_SECONDS,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete expired embed tokens.")
+    parser.add_argument("--batch-size", type=int, default=settings.REAPER_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=settings.REAPER_BATCH_PAUSE_SECONDS)
+    parser.add_argument("--max-batches", type=int, default=0, help="0 = until no expired tokens are left")
+    parser.add_argument("--retention", type=float, default=settings.REAPER_RETENTION_SECONDS)
+    parser.add_argument("--weeks-ahead", type=int, default=settings.EMBED_TOKEN_PARTITION_WEEKS_AHEAD)
+    parser.add_argument("--lock-timeout", type=float, default=settings.EMBED_TOKEN_PARTITION_LOCK_TIMEOUT_SECONDS)
+    args = parser.parse_args()
+    once = Reaper(args.batch_size, args.pause, args.max_batches, args.retention, args.weeks_ahead, args.lock_timeout)
+
+    async def run() -> int:
+        try:
+            return await once.run_once()
+        finally:
+            await engine.dispose()
+
+    print(f"Reclaimed {asyncio.run(run())} expired embed tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,24 @@ from app.config import settings
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+
+def _engine_options() -> dict:
+    # DB_ECHO accepts true/false or "debug" (which also logs result rows).
+    echo = settings.DB_ECHO.strip().lower()
+    options = {
+        "echo": "debug" if echo == "debug" else echo in ("1", "true", "yes", "on"),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if "+asyncpg" in DATABASE_URL:
+        options["connect_args"] = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return options
+
+
+engine = create_async_engine(DATABASE_URL, **_engine_options())
 AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -17,3 +34,15 @@ async def get_session():
             yield session
         finally:
             await session.close()
+
+
+def pool_stats() -> dict:
+    pool = engine.pool
+    stats = {"status": pool.status()}
+    # QueuePool-style pools expose counters; NullPool/StaticPool do not.
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        counter = getattr(pool, name, None)
+        if callable(counter):
+            stats[name] = counter()
+    stats["maxOverflow"] = settings.DB_MAX_OVERFLOW
+    return stats
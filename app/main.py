@@ -1,51 +1,93 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from app.api import embed, proxy
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from app.api import embed, metrics, proxy
+from app.api.embed import render_embed_page
 from app.db.crud import find_by_token
+from app.db.reaper import reaper
 from app.db.session import get_session
+from app.services import close_driver, init_driver
+from app.services.admission import bind_client
+from app.services.cancellation import cancel_on_disconnect
+from app.static_assets import PrecompressedStaticFiles, public_assets
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
+from app.config import settings
 from datetime import datetime, timezone
 import os
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    public_assets.load()
+    # The Neo4j driver (and its connection pool) lives exactly as long as the app.
+    await init_driver()
+    reaping = (
+        asyncio.create_task(reaper.run_forever(settings.REAPER_INTERVAL_SECONDS))
+        if settings.REAPER_INTERVAL_SECONDS > 0
+        else None
+    )
+    yield
+    if reaping is not None:
+        reaping.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await reaping
+    await close_driver()
+
+
 app = FastAPI(
     title="Neo4j Embedder API",
     description="API for generating embeddable Neo4j graph visualizations",
     version="1.0.0",
     docs_url="/docs",  # Swagger UI
     redoc_url="/redoc",  # ReDoc
-    openapi_url="/openapi.json"  # OpenAPI schema
+    openapi_url="/openapi.json",  # OpenAPI schema
+    lifespan=lifespan
 )
 
 # Include API routers
 app.include_router(embed.router)
 app.include_router(proxy.router)
+app.include_router(metrics.router)
 
-# Mount static files from public directory
-app.mount("/static", StaticFiles(directory="public"), name="static")
+# Mount static files from public directory; HTML pages are served precompressed
+app.mount(
+    "/static",
+    PrecompressedStaticFiles(directory=settings.STATIC_DIRECTORY, assets=public_assets),
+    name="static",
+)
 
 @app.get("/", tags=["Health"], summary="Health Check")
 async def root():
     """Health check endpoint"""
     return {"success": True, "message": "fastapi-neo4j backend"}
 
-@app.get("/view/{token}", tags=["Embed"], summary="View Embed Page")
-async def view_embed(token: str, session_gen=Depends(get_session)):
+@app.get("/view/{token}", tags=["Embed"], summary="View Embed Page", dependencies=[Depends(bind_client)])
+async def view_embed(token: str, request: Request, session_gen=Depends(get_session)):
     """
     Serve the embed visualization page for a given token.
     
     - **token**: The embed token from the URL path
     
-    Returns an HTML page that displays the Neo4j visualization.
+    Returns an HTML page that displays the Neo4j visualization. Pages are
+    served gzip/brotli-compressed with an ETag; `no-cache` makes browsers
+    revalidate, so repeat views get a bodiless 304. With
+    `EMBED_INLINE_BOOTSTRAP` on, the token metadata and the (cached) graph
+    result are inlined into the page so it renders from this one response.
     """
     async with session_gen as session:
         embed_record = await find_by_token(session, token)
         if not embed_record:
-            return FileResponse("public/embed-not-found.html")
-        if embed_record.expires_at < datetime.now(timezone.utc):
-            return FileResponse("public/embed-expired.html")
-    return FileResponse("public/embed.html")
+            page = "embed-not-found.html"
+        elif embed_record.expires_at < datetime.now(timezone.utc):
+            page = "embed-expired.html"
+        else:
+            page = "embed.html"
+    if page == "embed.html" and settings.EMBED_INLINE_BOOTSTRAP:
+        rendered = await cancel_on_disconnect(request, render_embed_page(token, embed_record))
+        return rendered.response(request, cache_control="no-cache")
+    return public_assets.response(request, page, cache_control="no-cache")
 
 @app.get("/api/embed/{token}", tags=["Embed"], summary="Get Embed Data")
 async def get_embed_data(token: str, session_gen=Depends(get_session)):
@@ -1,3 +1,19 @@
-from .neo4j_service import run_cypher
+from .neo4j_service import (
+    close_driver,
+    init_driver,
+    open_cypher_stream,
+    pool_stats,
+    run_cypher,
+    run_cypher_coalesced,
+    stream_cypher,
+)
 
-__all__ = ["run_cypher"]
+__all__ = [
+    "close_driver",
+    "init_driver",
+    "open_cypher_stream",
+    "pool_stats",
+    "run_cypher",
+    "run_cypher_coalesced",
+    "stream_cypher",
+]
@@ -0,0 +1,117 @@
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+
+# Client the current request's Neo4j work is charged to; set per request by bind_client().
+current_client: ContextVar[Optional[str]] = ContextVar("admission_client", default=None)
+
+
+class AdmissionRejected(HTTPException):
+    """A query turned away by admission control (429 or 503, with Retry-After)."""
+
+
+class AdmissionController:
+    """Bound concurrent Neo4j work, globally and per client.
+
+    At most ``max_concurrent`` sessions run at once; up to ``max_queue``
+    more wait for a slot, each for at most ``queue_timeout`` seconds. A
+    client with ``per_client`` queries already running or queued is
+    rejected immediately with 429, so one heavy caller cannot occupy the
+    whole pool; a full queue or an expired wait is rejected with 503.
+    ``max_concurrent <= 0`` disables admission control.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float, per_client: int, retry_after: int):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.per_client = per_client
+        self.retry_after = retry_after
+        self._slots = asyncio.Semaphore(max_concurrent) if max_concurrent > 0 else None
+        self._clients = Counter()
+        self._active = 0
+        self._waiting = 0
+        self._peak_waiting = 0
+        self._admitted = 0
+        self._rejected = {"clientLimit": 0, "queueFull": 0, "queueTimeout": 0}
+
+    def _reject(self, reason: str, status_code: int, detail: str) -> AdmissionRejected:
+        self._rejected[reason] += 1
+        return AdmissionRejected(status_code=status_code, detail=detail, headers={"Retry-After": str(self.retry_after)})
+
+    async def _acquire(self):
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return
+        if self._waiting >= self.max_queue:
+            raise self._reject("queueFull", 503, "Too many queries waiting for Neo4j; retry later")
+        self._waiting += 1
+        self._peak_waiting = max(self._peak_waiting, self._waiting)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("queueTimeout", 503, "Timed out waiting for a Neo4j query slot; retry later")
+        finally:
+            self._waiting -= 1
+
+    @asynccontextmanager
+    async def admit(self, client: Optional[str] = None):
+        """Hold a query slot for the duration of the block, or raise ``AdmissionRejected``."""
+        if self._slots is None:
+            yield
+            return
+        if client is not None and 0 < self.per_client <= self._clients[client]:
+            raise self._reject("clientLimit", 429, "Too many concurrent queries from this client")
+        if client is not None:
+            self._clients[client] += 1
+        try:
+            await self._acquire()
+            self._active += 1
+            self._admitted += 1
+            try:
+                yield
+            finally:
+                self._active -= 1
+                self._slots.release()
+        finally:
+            if client is not None:
+                self._clients[client] -= 1
+                if not self._clients[client]:
+                    del self._clients[client]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._slots is not None,
+            "maxConcurrent": self.max_concurrent,
+            "maxQueue": self.max_queue,
+            "perClient": self.per_client,
+            "active": self._active,
+            "queueDepth": self._waiting,
+            "peakQueueDepth": self._peak_waiting,
+            "clients": len(self._clients),
+            "admitted": self._admitted,
+            "rejected": dict(self._rejected),
+        }
+
+
+admission = AdmissionController(
+    max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    per_client=settings.ADMISSION_PER_CLIENT_CONCURRENCY,
+    retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+)
+
+
+async def bind_client(request: Request):
+    """Dependency charging the request's Neo4j work to its client: ``ADMISSION_CLIENT_HEADER`` or the peer address."""
+    client = request.headers.get(settings.ADMISSION_CLIENT_HEADER) if settings.ADMISSION_CLIENT_HEADER else None
+    if not client and request.client is not None:
+        client = request.client.host
+    current_client.set(client)
@@ -0,0 +1,98 @@
+from neo4j.spatial import Point
+from neo4j.time import Date, DateTime, Duration, Time
+
+from app.services.serialization import dumps, encode_default
+
+try:
+    import msgpack
+except ImportError:  # optional; without it application/msgpack is not offered
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional; without it Arrow IPC is not offered
+    pa = None
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+def available_media_types() -> list:
+    media_types = []
+    if pa is not None:
+        media_types.append(ARROW_STREAM_MEDIA_TYPE)
+    if msgpack is not None:
+        media_types.append(MSGPACK_MEDIA_TYPE)
+    return media_types
+
+
+def requested_media_type(accept: str):
+    """The columnar media type named in an ``Accept`` header, or None (wildcards do not count)."""
+    accepted = {item.split(";")[0].strip().lower() for item in accept.split(",")}
+    for media_type in (ARROW_STREAM_MEDIA_TYPE, MSGPACK_MEDIA_TYPE):
+        if media_type in accepted:
+            return media_type
+    return None
+
+
+def _columns(records: list) -> dict:
+    # Column order follows first appearance; records missing a key get null.
+    names = {}
+    for record in records:
+        names.update(dict.fromkeys(record))
+    return {name: [record.get(name) for record in records] for name in names}
+
+
+def _batches(records: list, batch_rows: int):
+    for start in range(0, len(records), batch_rows):
+        yield records[start:start + batch_rows]
+
+
+def encode_msgpack(records: list, batch_rows: int) -> bytes:
+    """Concatenated MessagePack maps, one per batch of ``batch_rows`` records: ``{column: [values]}``.
+
+    Read them back with ``msgpack.Unpacker``.
+    """
+    packer = msgpack.Packer(default=encode_default)
+    return b"".join(packer.pack(_columns(batch)) for batch in _batches(records, batch_rows))
+
+
+def _arrow_scalar(value):
+    # Temporal values map onto Arrow timestamp/date/time types (to microsecond precision).
+    if isinstance(value, (Date, DateTime, Time)):
+        return value.to_native()
+    if isinstance(value, (Duration, Point)):
+        return encode_default(value)
+    return value
+
+
+def _arrow_column(values: list):
+    try:
+        return pa.array([_arrow_scalar(value) for value in values])
+    except (pa.ArrowException, TypeError, ValueError, OverflowError):
+        # Mixed or nested Neo4j values: keep the column as one JSON string per value.
+        return pa.array([None if value is None else dumps(value).decode("utf-8") for value in values], pa.string())
+
+
+def encode_arrow(records: list, batch_rows: int) -> bytes:
+    """An Arrow IPC stream of the records in batches of ``batch_rows``.
+
+    Column types are inferred from the whole result, so every batch shares
+    one schema; columns Arrow cannot type are sent as JSON strings.
+    """
+    table = pa.table(
+        {name: _arrow_column(values) for name, values in _columns(records).items()}
+        if records
+        else {}
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_columnar(records: list, media_type: str, batch_rows: int) -> bytes:
+    if media_type == ARROW_STREAM_MEDIA_TYPE:
+        return encode_arrow(records, batch_rows)
+    return encode_msgpack(records, batch_rows)
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import re
+
+# String literals, quoted identifiers and comments are blanked out before
+# keyword scanning so `{name: "Create"}` is not mistaken for a CREATE clause.
+_LITERALS_AND_COMMENTS = re.compile(
+    r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|//[^\n]*|/\*.*?\*/",
+    re.DOTALL,
+)
+
+# Write clauses anywhere in the query, subqueries included. Property keys
+# (`n.set`, `{set: 1}`), labels (`:Create`) and parameters (`$delete`) are not clauses.
+_WRITE_CLAUSES = re.compile(
+    r"(?<![.$:])\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|INSERT|LOAD\s+CSV)\b(?!\s*:)",
+    re.IGNORECASE,
+)
+
+# `CALL some.procedure(...)` may write; `CALL { ... }` subqueries are checked by the scan above.
+_PROCEDURE_CALL = re.compile(r"(?<![.$:])\bCALL\b(?!\s*[{:])", re.IGNORECASE)
+
+# Clauses a read-only query may start with. Anything else (GRANT, DENY,
+# REVOKE, ALTER, USE, CYPHER options, ...) is not treated as read-only.
+_READ_LEADING_CLAUSE = re.compile(
+    r"\s*(?:(?:MATCH|OPTIONAL\s+MATCH|WITH|UNWIND|RETURN|SHOW)\b|CALL\s*\{)", re.IGNORECASE
+)
+
+# Leading clauses that say nothing about writes on their own; any other
+# leading clause (GRANT, ALTER, START DATABASE, ...) is an administrative write.
+_NEUTRAL_LEADING_CLAUSE = re.compile(r"\s*(?:USE|CYPHER|CALL)\b", re.IGNORECASE)
+
+# Results of classify_query().
+READ = "read"
+WRITE = "write"
+AMBIGUOUS = "ambiguous"
+
+
+# Clause keywords that matter for rewriting the end of a query.
+_CLAUSE_KEYWORDS = re.compile(
+    r"(?<![.$])\b(RETURN|UNION|ORDER\s+BY|SKIP|OFFSET|LIMIT)\b", re.IGNORECASE
+)
+
+_PARAMETER = re.compile(r"\$(\w+)")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def strip_literals(cypher: str) -> str:
+    return _LITERALS_AND_COMMENTS.sub(" ", cypher)
+
+
+def _mask_literals(cypher: str) -> str:
+    # Like strip_literals, but keeps every offset so matches index into the original text.
+    return _LITERALS_AND_COMMENTS.sub(lambda match: " " * len(match.group()), cypher)
+
+
+def _top_level_keywords(cypher: str) -> list:
+    """``(KEYWORD, start, end)`` for clause keywords outside brackets, subqueries and literals."""
+    masked = _mask_literals(cypher)
+    depth_at, depth = [], 0
+    for char in masked:
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        depth_at.append(depth)
+    return [
+        (" ".join(match.group(1).upper().split()), match.start(), match.end())
+        for match in _CLAUSE_KEYWORDS.finditer(masked)
+        if depth_at[match.start()] == 0
+    ]
+
+
+def _int_expression(expression: str, params: dict) -> int:
+    expression = expression.strip()
+    parameter = _PARAMETER.fullmatch(expression)
+    value = params.get(parameter.group(1)) if parameter else expression
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"cannot rewrite SKIP/LIMIT {expression!r}; use an integer or a parameter")
+    if isinstance(value, bool) or number < 0:
+        raise ValueError(f"invalid SKIP/LIMIT {expression!r}")
+    return number
+
+
+def window_final_return(cypher: str, params: dict, skip: int = 0, limit: int = None):
+    """Restrict the rows of a query's final RETURN to ``limit`` rows starting at row ``skip``.
+
+    An existing SKIP/LIMIT on the final RETURN (integer literals or
+    parameters) is combined with the requested window rather than replaced,
+    so the rewrite never returns rows the original query would not. Returns
+    ``(cypher, params)``: the window is passed as ``$_rowSkip`` /
+    ``$_rowLimit`` so every page shares one query plan. Raises ``ValueError``
+    for queries without a final RETURN, UNION queries (the window would only
+    apply to the last branch) and SKIP/LIMIT expressions it cannot evaluate.
+    The normalized query is rewritten, so a trailing comment cannot swallow
+    the appended window.
+    """
+    text = normalize_cypher(cypher)
+    keywords = _top_level_keywords(text)
+    if any(keyword == "UNION" for keyword, _, _ in keywords):
+        raise ValueError("UNION queries cannot be windowed")
+    returns = [start for keyword, start, _ in keywords if keyword == "RETURN"]
+    if not returns:
+        raise ValueError("query has no final RETURN clause")
+    tail = [(keyword, start, end) for keyword, start, end in keywords if start > returns[-1]]
+
+    base_end = len(text)
+    skip_expression = limit_expression = None
+    for index, (keyword, start, end) in enumerate(tail):
+        if keyword not in ("SKIP", "OFFSET", "LIMIT"):
+            continue
+        base_end = min(base_end, start)
+        value_end = tail[index + 1][1] if index + 1 < len(tail) else len(text)
+        if keyword == "LIMIT":
+            limit_expression = text[end:value_end]
+        else:
+            skip_expression = text[end:value_end]
+
+    existing_skip = _int_expression(skip_expression, params) if skip_expression is not None else 0
+    existing_limit = _int_expression(limit_expression, params) if limit_expression is not None else None
+    if existing_limit is not None:
+        remaining = max(0, existing_limit - skip)
+        limit = remaining if limit is None else min(limit, remaining)
+    if "_rowSkip" in params or "_rowLimit" in params:
+        raise ValueError("$_rowSkip and $_rowLimit are reserved parameter names")
+
+    rewritten = text[:base_end].rstrip() + " SKIP $_rowSkip"
+    window = {"_rowSkip": existing_skip + skip}
+    if limit is not None:
+        rewritten += " LIMIT $_rowLimit"
+        window["_rowLimit"] = limit
+    return rewritten, {**params, **window}
+
+
+def classify_query(cypher: str) -> str:
+    """Syntactic access check: ``READ``, ``WRITE`` or ``AMBIGUOUS``.
+
+    ``WRITE`` for a write clause anywhere or an administrative command;
+    ``READ`` only when the query starts with a read clause and has no
+    procedure call; ``AMBIGUOUS`` otherwise (procedure calls, ``USE`` or
+    ``CYPHER`` prefixes), which only the planner can settle.
+    """
+    text = strip_literals(cypher)
+    if _WRITE_CLAUSES.search(text):
+        return WRITE
+    if _READ_LEADING_CLAUSE.match(text):
+        return AMBIGUOUS if _PROCEDURE_CALL.search(text) else READ
+    return AMBIGUOUS if _NEUTRAL_LEADING_CLAUSE.match(text) else WRITE
+
+
+def is_read_only(cypher: str) -> bool:
+    """Conservative syntactic check: True only when the query cannot write."""
+    return classify_query(cypher) == READ
+
+
+def normalize_cypher(cypher: str) -> str:
+    """Canonical text of a query: comments dropped, whitespace collapsed outside literals, no trailing ``;``.
+
+    Queries that differ only in layout normalize to the same text, so they
+    share one stored row and one Neo4j plan cache entry.
+    """
+    without_comments = _LITERALS_AND_COMMENTS.sub(
+        lambda match: " " if match.group().startswith("/") else match.group(), cypher
+    )
+    parts, position = [], 0
+    for match in _LITERALS_AND_COMMENTS.finditer(without_comments):
+        parts.append(_WHITESPACE.sub(" ", without_comments[position:match.start()]))
+        parts.append(match.group())
+        position = match.end()
+    parts.append(_WHITESPACE.sub(" ", without_comments[position:]))
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+
+def query_hash(cypher: str) -> str:
+    """SHA-256 of the normalized query text; the key of a stored query."""
+    return hashlib.sha256(normalize_cypher(cypher).encode("utf-8")).hexdigest()
+
+
+def query_key(cypher: str, params: dict) -> str:
+    """Stable hash of a query and its parameters, used to key caches and in-flight calls."""
+    canonical = json.dumps([cypher, params or {}], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
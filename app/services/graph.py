@@ -0,0 +1,75 @@
+from neo4j.graph import Node, Path, Relationship
+
+
+def node_to_dict(node: Node) -> dict:
+    return {"id": node.element_id, "labels": sorted(node.labels), "properties": dict(node)}
+
+
+def relationship_to_dict(rel: Relationship) -> dict:
+    return {
+        "id": rel.element_id,
+        "type": rel.type,
+        "startNode": rel.start_node.element_id,
+        "endNode": rel.end_node.element_id,
+        "properties": dict(rel),
+    }
+
+
+class GraphCollector:
+    """Accumulate the nodes and relationships found in result values, keyed by element id.
+
+    Each entity is kept once however many rows it appears in. Values that are
+    not graph entities (scalars, maps of scalars) are ignored.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.relationships = {}
+
+    def _add_node(self, node: Node):
+        known = self.nodes.get(node.element_id)
+        # Endpoints of a relationship whose nodes were not returned themselves
+        # arrive without labels or properties; keep the richest copy seen.
+        if known is None or (
+            not known["labels"] and not known["properties"] and (node.labels or len(node))
+        ):
+            self.nodes[node.element_id] = node_to_dict(node)
+            return True
+        return False
+
+    def _add_relationship(self, rel: Relationship):
+        new = []
+        if rel.element_id not in self.relationships:
+            self.relationships[rel.element_id] = relationship_to_dict(rel)
+            new.append(("relationship", rel.element_id))
+        for node in (rel.start_node, rel.end_node):
+            if node is not None and self._add_node(node):
+                new.append(("node", node.element_id))
+        return new
+
+    def add(self, value) -> list:
+        """Add every entity in ``value``; return ``(kind, element_id)`` for those new or enriched."""
+        if isinstance(value, Node):
+            return [("node", value.element_id)] if self._add_node(value) else []
+        if isinstance(value, Relationship):
+            return self._add_relationship(value)
+        if isinstance(value, Path):
+            new = []
+            for node in value.nodes:
+                if self._add_node(node):
+                    new.append(("node", node.element_id))
+            for rel in value.relationships:
+                new.extend(self._add_relationship(rel))
+            return new
+        if isinstance(value, (list, tuple)):
+            return [entry for item in value for entry in self.add(item)]
+        if isinstance(value, dict):
+            return [entry for item in value.values() for entry in self.add(item)]
+        return []
+
+    def entity(self, kind: str, element_id: str) -> dict:
+        """The stored node or relationship for an entry returned by ``add``."""
+        return (self.nodes if kind == "node" else self.relationships)[element_id]
+
+    def to_dict(self) -> dict:
+        return {"nodes": list(self.nodes.values()), "relationships": list(self.relationships.values())}
@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+
+from app.cache import TTLCache
+from app.config import settings
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; without it graphs are laid out by the browser
+    np = None
+
+# Node coordinates per layout key ({node_id: (x, y)}), kept much longer than
+# query results so a refreshed result reuses the positions viewers already saw.
+layout_cache = TTLCache(max_size=settings.LAYOUT_CACHE_MAX_ENTRIES, ttl=settings.LAYOUT_CACHE_TTL_SECONDS)
+
+
+def layout_available() -> bool:
+    return np is not None and settings.EMBED_SERVER_LAYOUT
+
+
+def compute_layout(node_ids, edges, iterations: int = None, spring_length: float = None, block_size: int = 512):
+    """Fruchterman-Reingold force-directed layout, vectorized with NumPy.
+
+    ``edges`` are ``(source_index, target_index)`` pairs into ``node_ids``.
+    Repulsion is evaluated in row blocks so memory stays at
+    ``block_size * n`` pairs instead of ``n * n``. The initial placement is
+    seeded from the node ids, so the same graph always gets the same layout.
+    Returns ``{node_id: (x, y)}`` in vis-network pixel units.
+    """
+    iterations = iterations or settings.LAYOUT_ITERATIONS
+    k = spring_length or settings.LAYOUT_SPRING_LENGTH
+    n = len(node_ids)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {node_ids[0]: (0.0, 0.0)}
+
+    seed = int.from_bytes(hashlib.sha256("\x00".join(map(str, node_ids)).encode("utf-8")).digest()[:8], "big")
+    rng = np.random.default_rng(seed)
+    extent = k * np.sqrt(n)
+    pos = rng.uniform(-extent / 2, extent / 2, size=(n, 2)).astype(np.float32)
+    x, y = pos[:, 0], pos[:, 1]
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    src, dst = edges[:, 0], edges[:, 1]
+    k2 = np.float32(k * k)
+    # Linear pull towards the origin. Against the summed repulsion of all
+    # nodes it settles at a radius of about k * sqrt(n), the initial extent,
+    # and keeps disconnected components on screen.
+    gravity = np.float32(settings.LAYOUT_GRAVITY)
+    temperature = extent / 10
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        disp_x = np.zeros(n, dtype=np.float32)
+        disp_y = np.zeros(n, dtype=np.float32)
+        for start in range(0, n, block_size):
+            stop = min(start + block_size, n)
+            dx = x[start:stop, None] - x[None, :]
+            dy = y[start:stop, None] - y[None, :]
+            scale = dx * dx
+            scale += dy * dy
+            np.maximum(scale, 0.01, out=scale)
+            np.divide(k2, scale, out=scale)
+            disp_x[start:stop] += (dx * scale).sum(axis=1)
+            disp_y[start:stop] += (dy * scale).sum(axis=1)
+        if len(edges):
+            dx = x[src] - x[dst]
+            dy = y[src] - y[dst]
+            pull = np.sqrt(dx * dx + dy * dy) / k
+            np.add.at(disp_x, src, -dx * pull)
+            np.add.at(disp_x, dst, dx * pull)
+            np.add.at(disp_y, src, -dy * pull)
+            np.add.at(disp_y, dst, dy * pull)
+        disp_x -= gravity * x
+        disp_y -= gravity * y
+        length = np.sqrt(disp_x * disp_x + disp_y * disp_y)
+        np.maximum(length, 1e-6, out=length)
+        step = np.minimum(length, temperature) / length
+        x += disp_x * step
+        y += disp_y * step
+        temperature -= cooling
+
+    pos -= pos.mean(axis=0)
+    return {node_id: (round(float(x), 1), round(float(y), 1)) for node_id, (x, y) in zip(node_ids, pos)}
+
+
+async def apply_layout(key, graph: dict) -> dict:
+    """Add ``x``/``y`` to every node of a graph-format result, using cached positions for ``key``.
+
+    The graph is returned unchanged when NumPy is missing, layout is disabled
+    or it has more than ``LAYOUT_MAX_NODES`` nodes.
+    """
+    nodes = graph.get("nodes") or []
+    if not layout_available() or not nodes or len(nodes) > settings.LAYOUT_MAX_NODES:
+        return graph
+    found, positions = layout_cache.lookup(key)
+    if not found or any(node["id"] not in positions for node in nodes):
+        node_ids = [node["id"] for node in nodes]
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+        edges = [
+            (index[rel["startNode"]], index[rel["endNode"]])
+            for rel in graph.get("relationships") or []
+            if rel["startNode"] in index and rel["endNode"] in index
+        ]
+        # CPU-bound; keep it off the event loop.
+        positions = await asyncio.to_thread(compute_layout, node_ids, edges)
+        layout_cache.set(key, positions)
+    for node in nodes:
+        node["x"], node["y"] = positions[node["id"]]
+    return graph
@@ -0,0 +1,69 @@
+from app.config import settings
+from app.services.cypher import is_read_only, window_final_return
+from app.services.serialization import dumps
+
+
+class Rows(list):
+    """Records of a query; ``truncated`` is set when a result cap cut the result short."""
+
+    truncated = False
+
+
+class ResultTruncated(Exception):
+    """Raised by a record stream after its last record when a result cap stopped it early."""
+
+
+def is_truncated(data) -> bool:
+    """Whether a ``run_cypher`` result (rows or graph) was cut short by a result cap."""
+    if isinstance(data, dict):
+        return bool(data.get("truncated"))
+    return getattr(data, "truncated", False)
+
+
+class ResultGuard:
+    """Row and serialized-byte budget for one query result, checked as records arrive.
+
+    ``exhausted()`` is asked before each further record, so a result is only
+    marked truncated when records are actually left over. Byte counting stops
+    after the record that crosses ``max_bytes``, so a result can exceed it
+    by at most one record.
+    """
+
+    def __init__(self, max_rows: int = None, max_bytes: int = None):
+        self.max_rows = settings.RESULT_MAX_ROWS if max_rows is None else max_rows
+        self.max_bytes = settings.RESULT_MAX_BYTES if max_bytes is None else max_bytes
+        self.rows = 0
+        self.bytes = 0
+        self.truncated = False
+
+    def exhausted(self) -> bool:
+        if (self.max_rows > 0 and self.rows >= self.max_rows) or (self.max_bytes > 0 and self.bytes >= self.max_bytes):
+            self.truncated = True
+        return self.truncated
+
+    def add(self, *values):
+        """Count one record; ``values`` are what it adds to the response, measured only if bytes are capped."""
+        self.rows += 1
+        if self.max_bytes > 0:
+            self.bytes += sum(len(dumps(value)) for value in values)
+
+    def add_encoded(self, size: int):
+        """Count one record already encoded to ``size`` bytes for the response."""
+        self.rows += 1
+        self.bytes += size
+
+
+def limit_query(cypher: str, params: dict):
+    """Cap the final RETURN of a read-only query at ``RESULT_MAX_ROWS + 1`` rows, when enabled.
+
+    The extra row lets the guard tell a result that was cut from one that
+    fits exactly. Queries that may write are left alone, since LIMIT does not
+    stop their side effects, as are queries the rewrite cannot handle; the
+    streaming row cap still applies to those.
+    """
+    if not settings.RESULT_INJECT_LIMIT or settings.RESULT_MAX_ROWS <= 0 or not is_read_only(cypher):
+        return cypher, params
+    try:
+        return window_final_return(cypher, params, limit=settings.RESULT_MAX_ROWS + 1)
+    except ValueError:
+        return cypher, params
@@ -1,29 +1,351 @@
-from neo4j import AsyncGraphDatabase
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from neo4j import READ_ACCESS, WRITE_ACCESS, AsyncGraphDatabase, Query
+from neo4j import exceptions as neo4j_exceptions
 from neo4j.exceptions import ServiceUnavailable, Neo4jError
 from fastapi import HTTPException
 
 # Use the app settings (which load .env) instead of reading os.environ directly.
+from app.cache import TTLCache
 from app.config import settings
+from app.services.admission import admission, current_client
+from app.services.cypher import READ, WRITE, classify_query, is_read_only, query_key
+from app.services.graph import GraphCollector
+from app.services.limits import ResultGuard, ResultTruncated, Rows, limit_query
+from app.services.singleflight import SingleFlight
 
 # Ensure we use string values from settings
 NEO4J_URI = str(getattr(settings, "NEO4J_URI", "bolt://localhost:7687"))
 NEO4J_USER = getattr(settings, "NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = getattr(settings, "NEO4J_PASSWORD", "password")
 
-# Create driver using settings so credentials from `.env` (via Settings) are used.
-driver = AsyncGraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# Older 5.x drivers report pool exhaustion as a plain ClientError.
+ConnectionAcquisitionTimeoutError = getattr(neo4j_exceptions, "ConnectionAcquisitionTimeoutError", ())
+
+logger = logging.getLogger(__name__)
+
+# The driver is owned by the FastAPI lifespan (init_driver / close_driver);
+# get_driver() creates it lazily for callers running outside the app.
+_driver = None
+
+# Sessions checked out through _session(); the driver has no public pool metrics.
+_pool_usage = {"inUse": 0, "peakInUse": 0, "acquired": 0, "acquisitionTimeouts": 0}
+
+# EXPLAIN-derived query types ("r", "rw", "w", "s"), keyed by query text.
+_query_type_cache = TTLCache(max_size=4096, ttl=3600)
+_routing = {"read": 0, "write": 0, "explained": 0}
+
+# Extra time the client-side deadline allows past the server transaction timeout,
+# so Neo4j normally reports the timeout itself and the connection stays usable.
+QUERY_TIMEOUT_GRACE = 2.0
+
+# Result formats: one dict per record, or deduplicated {nodes, relationships}.
+ROWS = "rows"
+GRAPH = "graph"
+
+
+def _create_driver():
+    # Create driver using settings so credentials from `.env` (via Settings) are used.
+    return AsyncGraphDatabase.driver(
+        NEO4J_URI,
+        auth=(NEO4J_USER, NEO4J_PASSWORD),
+        max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+        connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+        max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
+        keep_alive=settings.NEO4J_KEEP_ALIVE,
+    )
+
+
+def get_driver():
+    global _driver
+    if _driver is None:
+        _driver = _create_driver()
+    return _driver
+
+
+async def _warm_up_connection():
+    async with _session() as session:
+        result = await session.run("RETURN 1")
+        await result.consume()
+
+
+async def init_driver():
+    """Create the driver, verify connectivity and pre-open ``NEO4J_WARMUP_CONNECTIONS`` connections.
+
+    Connectivity problems are logged rather than raised so the app can still
+    start (and serve cached embeds) while Neo4j is unavailable.
+    """
+    driver = get_driver()
+    try:
+        await driver.verify_connectivity()
+        # Concurrent sessions each need their own connection, which then stays idle in the pool.
+        warmup = min(settings.NEO4J_WARMUP_CONNECTIONS, settings.NEO4J_MAX_CONNECTION_POOL_SIZE)
+        await asyncio.gather(*(_warm_up_connection() for _ in range(warmup)))
+    except Exception as e:
+        logger.warning("Neo4j warm-up failed: %s", e)
+
+
+async def close_driver():
+    global _driver
+    if _driver is not None:
+        await _driver.close()
+        _driver = None
+
+
+@asynccontextmanager
+async def _session(**config):
+    # Admission control caps sessions below the driver pool, so waiting happens
+    # in a bounded queue rather than on connection acquisition.
+    async with admission.admit(current_client.get()):
+        _pool_usage["inUse"] += 1
+        _pool_usage["acquired"] += 1
+        _pool_usage["peakInUse"] = max(_pool_usage["peakInUse"], _pool_usage["inUse"])
+        try:
+            async with get_driver().session(
+                database=settings.NEO4J_DATABASE, fetch_size=settings.NEO4J_FETCH_SIZE, **config
+            ) as session:
+                yield session
+        finally:
+            _pool_usage["inUse"] -= 1
+
+
+def pool_stats() -> dict:
+    """Pool configuration and utilization, for sizing ``NEO4J_MAX_CONNECTION_POOL_SIZE``."""
+    stats = {
+        "maxPoolSize": settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+        "sessionsInUse": _pool_usage["inUse"],
+        "peakSessionsInUse": _pool_usage["peakInUse"],
+        "sessionsAcquired": _pool_usage["acquired"],
+        "acquisitionTimeouts": _pool_usage["acquisitionTimeouts"],
+    }
+    # Per-address connection counts come from driver internals; skip them if the layout changes.
+    try:
+        stats["connections"] = {
+            str(address): {"open": len(conns), "inUse": sum(1 for c in conns if c.in_use)}
+            for address, conns in _driver._pool.connections.items()
+        }
+    except AttributeError:
+        pass
+    return stats
+
+
+async def resolve_access_mode(cypher: str, params: dict, access_mode: str = None) -> str:
+    """Pick READ_ACCESS or WRITE_ACCESS for a query.
+
+    A mode declared by the caller wins. Otherwise queries that cannot write
+    are sent to readers and queries with a write clause to the leader;
+    ambiguous ones (procedure calls) are classified once with EXPLAIN when
+    ``NEO4J_EXPLAIN_ROUTING`` is on, and default to the leader otherwise.
+    """
+    if access_mode is not None:
+        return access_mode
+    if not settings.NEO4J_ROUTE_READS:
+        return WRITE_ACCESS
+    kind = classify_query(cypher)
+    if kind == READ:
+        return READ_ACCESS
+    if kind == WRITE or not settings.NEO4J_EXPLAIN_ROUTING:
+        return WRITE_ACCESS
+    found, query_type = _query_type_cache.lookup(cypher)
+    if not found:
+        try:
+            async with _session() as session:
+                result = await session.run("EXPLAIN " + cypher, **params)
+                query_type = (await result.consume()).query_type
+        except Exception:
+            # Leave the error for the real execution to report.
+            query_type = None
+        _routing["explained"] += 1
+        _query_type_cache.set(cypher, query_type)
+    return READ_ACCESS if query_type == "r" else WRITE_ACCESS
+
+
+async def _routed_session(cypher: str, params: dict, access_mode: str = None):
+    access_mode = await resolve_access_mode(cypher, params, access_mode)
+    _routing["read" if access_mode == READ_ACCESS else "write"] += 1
+    return _session(default_access_mode=access_mode)
 
 
-async def run_cypher(cypher: str, params: dict):
+def routing_stats() -> dict:
+    return {**_routing, "queryTypeCache": _query_type_cache.stats()}
+
+
+def query_timeout(timeout: float = None):
+    """Effective transaction timeout in seconds: the request's, capped, or ``NEO4J_QUERY_TIMEOUT_SECONDS``; None for none.
+
+    The cap applies only to timeouts a request asks for, so a default of 0 leaves queries unbounded.
+    """
+    if timeout is None:
+        default = settings.NEO4J_QUERY_TIMEOUT_SECONDS
+        return default if default > 0 else None
+    cap = settings.NEO4J_MAX_QUERY_TIMEOUT_SECONDS
+    if cap > 0 and (timeout <= 0 or timeout > cap):
+        timeout = cap
+    return timeout if timeout > 0 else None
+
+
+def _deadline(timeout):
+    return asyncio.timeout(None if timeout is None else timeout + QUERY_TIMEOUT_GRACE)
+
+
+def _to_http_error(e: Exception, timeout: float = None) -> HTTPException:
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, ConnectionAcquisitionTimeoutError):
+        _pool_usage["acquisitionTimeouts"] += 1
+        return HTTPException(status_code=503, detail=f"Neo4j connection pool exhausted: {str(e)}")
+    if isinstance(e, TimeoutError) or "TransactionTimedOut" in (getattr(e, "code", None) or ""):
+        return HTTPException(status_code=504, detail=f"Query timed out after {timeout:g}s" if timeout else "Query timed out")
+    if isinstance(e, ServiceUnavailable):
+        return HTTPException(status_code=503, detail=f"Neo4j service unavailable: {str(e)}")
+    if isinstance(e, Neo4jError):
+        return HTTPException(status_code=400, detail=f"Cypher query error: {str(e)}")
+    return HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
+async def run_cypher(
+    cypher: str, params: dict, result_format: str = ROWS, access_mode: str = None, timeout: float = None
+):
+    """Run a query and collect its result.
+
+    ``timeout`` (seconds, see ``query_timeout``) is sent to Neo4j as the
+    transaction timeout and also enforced client-side; either way the query
+    fails with 504. Cancelling the caller closes the session, which
+    terminates the transaction on the server.
+
+    Results stop at ``RESULT_MAX_ROWS`` records or ``RESULT_MAX_BYTES``
+    serialized; a cut result is flagged (see ``limits.is_truncated``).
+    """
+    timeout = query_timeout(timeout)
+    guard = ResultGuard()
+    limited, limited_params = limit_query(cypher, params)
+    try:
+        async with _deadline(timeout):
+            async with await _routed_session(cypher, params, access_mode) as session:
+                result = await session.run(Query(limited, timeout=timeout), **limited_params)
+                if result_format == GRAPH:
+                    graph = GraphCollector()
+                    async for record in result:
+                        if guard.exhausted():
+                            break
+                        entries = graph.add(record.values())
+                        guard.add(*(graph.entity(kind, element_id) for kind, element_id in entries))
+                    data = graph.to_dict()
+                    if guard.truncated:
+                        data["truncated"] = True
+                    return data
+                # AsyncResult is asynchronous; collect records asynchronously
+                records = Rows()
+                async for record in result:
+                    if guard.exhausted():
+                        records.truncated = True
+                        break
+                    records.append(record.data())
+                    guard.add(records[-1])
+                return records
+    except Exception as e:
+        raise _to_http_error(e, timeout)
+
+
+async def stream_cypher(
+    cypher: str,
+    params: dict,
+    result_format: str = ROWS,
+    access_mode: str = None,
+    timeout: float = None,
+    encode=None,
+):
+    """Yield results as they arrive from the cursor instead of collecting them.
+
+    Rows are yielded as ``record.data()`` dicts. In graph format each entity is
+    yielded once, as ``{"node": ...}`` or ``{"relationship": ...}``, when it is
+    first seen (or when a bare relationship endpoint is later seen in full).
+    ``timeout`` applies as the server-side transaction timeout only, since the
+    pace of a stream is set by its consumer. When a result cap stops the
+    stream, ``ResultTruncated`` is raised after the last record. With
+    ``encode`` (e.g. ``dumps``), items are yielded already encoded by it and
+    the byte cap counts exactly those bytes.
+    """
+    timeout = query_timeout(timeout)
+    guard = ResultGuard()
+    limited, limited_params = limit_query(cypher, params)
     try:
-        async with driver.session() as session:
-            result = await session.run(cypher, **params)
-            # AsyncResult is asynchronous; collect records asynchronously
-            records = [record.data() async for record in result]
-            return records
-    except ServiceUnavailable as e:
-        raise HTTPException(status_code=503, detail=f"Neo4j service unavailable: {str(e)}")
-    except Neo4jError as e:
-        raise HTTPException(status_code=400, detail=f"Cypher query error: {str(e)}")
+        async with await _routed_session(cypher, params, access_mode) as session:
+            result = await session.run(Query(limited, timeout=timeout), **limited_params)
+            graph = GraphCollector() if result_format == GRAPH else None
+            async for record in result:
+                if guard.exhausted():
+                    break
+                if graph is None:
+                    items = [record.data()]
+                else:
+                    items = [{kind: graph.entity(kind, element_id)} for kind, element_id in graph.add(record.values())]
+                if encode is None:
+                    guard.add(*items)
+                else:
+                    items = [encode(item) for item in items]
+                    guard.add_encoded(sum(len(item) for item in items))
+                for item in items:
+                    yield item
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+        raise _to_http_error(e, timeout)
+    if guard.truncated:
+        raise ResultTruncated(f"result truncated after {guard.rows} records")
+
+
+async def _prepend(first, records):
+    try:
+        yield first
+        async for record in records:
+            yield record
+    finally:
+        await records.aclose()
+
+
+async def _no_records():
+    return
+    yield
+
+
+async def open_cypher_stream(
+    cypher: str,
+    params: dict,
+    result_format: str = ROWS,
+    access_mode: str = None,
+    timeout: float = None,
+    encode=None,
+):
+    """Start ``stream_cypher`` and wait for its first record.
+
+    Errors raised when the query starts surface here, before a streaming
+    response has been committed, instead of part-way through the body.
+    """
+    records = stream_cypher(cypher, params, result_format, access_mode, timeout, encode)
+    try:
+        first = await anext(records)
+    except StopAsyncIteration:
+        return _no_records()
+    return _prepend(first, records)
+
+
+# In-flight identical read queries share one execution; writes never do,
+# since two identical CREATEs must both take effect.
+query_flight = SingleFlight()
+
+
+async def run_cypher_coalesced(
+    cypher: str, params: dict, result_format: str = ROWS, access_mode: str = None, timeout: float = None
+):
+    """Like ``run_cypher``, but concurrent identical read-only queries share one execution and result.
+
+    A shared execution runs with the timeout of the caller that started it.
+    """
+    shareable = access_mode == READ_ACCESS or (access_mode is None and is_read_only(cypher))
+    if not settings.PROXY_COALESCE_QUERIES or not shareable:
+        return await run_cypher(cypher, params, result_format, access_mode, timeout)
+    return await query_flight.do(
+        (result_format, query_key(cypher, params)),
+        lambda: run_cypher(cypher, params, result_format, access_mode, timeout),
+    )
@@ -0,0 +1,43 @@
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException
+
+from app.services.cypher import query_key, window_final_return
+
+# Cursors carry this much of the query hash; enough to reject a cursor replayed against another query.
+_CURSOR_HASH_CHARS = 16
+
+
+def encode_cursor(cypher: str, params: dict, offset: int) -> str:
+    """Opaque cursor for the page starting at row ``offset`` of this query."""
+    payload = {"q": query_key(cypher, params)[:_CURSOR_HASH_CHARS], "o": offset}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, cypher: str, params: dict) -> int:
+    """Row offset stored in ``cursor``; 400 if it is malformed or belongs to a different query."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        digest, offset = payload["q"], payload["o"]
+    except (binascii.Error, ValueError, UnicodeError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if digest != query_key(cypher, params)[:_CURSOR_HASH_CHARS] or not isinstance(offset, int) or offset < 0:
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this query")
+    return offset
+
+
+def page_query(cypher: str, params: dict, offset: int, page_size: int):
+    """Rewrite a query to return rows ``offset`` .. ``offset + page_size``, plus one to detect a next page."""
+    try:
+        return window_final_return(cypher, params, skip=offset, limit=page_size + 1)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Query cannot be paginated: {e}")
+
+
+def split_page(rows: list, cypher: str, params: dict, offset: int, page_size: int):
+    """``(page, next_cursor)`` from the rows of ``page_query``; ``next_cursor`` is None on the last page."""
+    if len(rows) <= page_size:
+        return rows, None
+    return rows[:page_size], encode_cursor(cypher, params, offset + page_size)
@@ -0,0 +1,169 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+
+import orjson
+
+from app.cache import TTLCache
+from app.config import settings
+from app.services.cypher import query_key
+from app.services.layout import apply_layout
+from app.services.limits import is_truncated
+from app.services.neo4j_service import GRAPH, run_cypher
+from app.services.serialization import dumps
+from app.services.singleflight import SingleFlight
+from app.services.snapshots import read_snapshot
+from app.services.summary import check_cluster, level_of_detail
+
+
+class ResultCache:
+    """TTL + byte-bounded cache of serialized query payloads with single-flight loading.
+
+    On a miss, concurrent requests for the same key share one ``loader()``
+    call; its payload is stored for the configured TTL unless the loader
+    raised, in which case nothing is cached.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, max_bytes: int, weigh: Callable[[Any], int] = len):
+        self._cache = TTLCache(max_size=max_entries, ttl=ttl, max_weight=max_bytes, weigh=weigh)
+        self._flight = SingleFlight()
+
+    @property
+    def enabled(self) -> bool:
+        return self._cache.max_size > 0 and self._cache.ttl > 0
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        return self._cache.lookup(key, count=False)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[bytes]]) -> bytes:
+        found, body = self._cache.lookup(key)
+        if found:
+            return body
+
+        async def load() -> bytes:
+            body = await loader()
+            self._cache.set(key, body)
+            return body
+
+        return await self._flight.do(key, load)
+
+    def invalidate(self, key: Hashable):
+        self._cache.invalidate(key)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        return self._cache.invalidate_where(predicate)
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), **self._flight.stats()}
+
+
+embed_result_cache = ResultCache(
+    max_entries=settings.EMBED_RESULT_CACHE_MAX_ENTRIES,
+    ttl=settings.EMBED_RESULT_CACHE_TTL_SECONDS,
+    max_bytes=settings.EMBED_RESULT_CACHE_MAX_BYTES,
+)
+
+
+
+class SourceGraph:
+    """An embed's graph-format result before summarization, shared by its coarse and cluster views.
+
+    ``partitions`` memoizes the clustering of each drill-down level (see
+    ``summary.level_of_detail``), so unknown cluster ids are rejected without
+    reclustering and cluster views never re-run the query.
+    """
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.partitions = {}
+
+
+# Raw graphs per query or snapshot; rendered views of them live in embed_result_cache.
+embed_graph_cache = ResultCache(
+    max_entries=settings.EMBED_RESULT_CACHE_MAX_ENTRIES,
+    ttl=settings.EMBED_RESULT_CACHE_TTL_SECONDS,
+    max_bytes=settings.EMBED_GRAPH_CACHE_MAX_BYTES,
+    weigh=lambda graph: len(graph.body),
+)
+
+
+def _source_key(cypher: str, snapshot_id=None):
+    return ("snapshot", snapshot_id) if snapshot_id is not None else query_key(cypher, {})
+
+
+async def _fetch_graph(cypher: str, snapshot_id=None) -> SourceGraph:
+    if snapshot_id is not None:
+        return SourceGraph(await read_snapshot(snapshot_id))
+    return SourceGraph(dumps(await run_cypher(cypher, {}, GRAPH)))
+
+
+async def _source_graph(cypher: str, snapshot_id=None) -> SourceGraph:
+    if not embed_graph_cache.enabled:
+        return await _fetch_graph(cypher, snapshot_id)
+    return await embed_graph_cache.get_or_load(
+        _source_key(cypher, snapshot_id), lambda: _fetch_graph(cypher, snapshot_id)
+    )
+
+
+def _summarize(graph: SourceGraph, cluster: str = None):
+    data = orjson.loads(graph.body)
+    return is_truncated(data), level_of_detail(data, cluster, partitions=graph.partitions)
+
+
+def _payload(data, truncated: bool) -> bytes:
+    if truncated:
+        return dumps({"success": True, "data": data, "truncated": True})
+    return dumps({"success": True, "data": data})
+
+
+async def _render_graph(cypher: str, layout_key=None, cluster: str = None, snapshot_id=None) -> bytes:
+    graph = await _source_graph(cypher, snapshot_id)
+    if cluster:
+        check_cluster(cluster, graph.partitions)
+    # Decoding and clustering a large result is CPU-bound; keep it off the event loop.
+    truncated, data = await asyncio.to_thread(_summarize, graph, cluster)
+    if layout_key is not None:
+        data = await apply_layout((layout_key, cluster) if cluster else layout_key, data)
+    return _payload(data, truncated)
+
+
+async def _render_rows(cypher: str) -> bytes:
+    data = await run_cypher(cypher, {})
+    return _payload(data, is_truncated(data))
+
+
+async def load_embed_result(
+    cypher: str, result_format: str, layout_key=None, cluster: str = None, snapshot_id=None
+) -> bytes:
+    """Serialized ``{success, data}`` body for an embed query, through the result cache when enabled.
+
+    Graph-format results above ``EMBED_SUMMARY_NODE_BUDGET`` nodes are
+    collapsed into clusters; ``cluster`` selects one of them to drill into.
+    All views of one result are derived from a single cached execution, and
+    cluster ids are checked before anything runs. With a ``layout_key``,
+    graph-format nodes carry server-computed ``x``/``y`` positions, cached
+    under that key. With a ``snapshot_id``, a graph-format result is read from
+    the embed's stored snapshot instead of Neo4j.
+    """
+    if result_format != GRAPH:
+        if not embed_result_cache.enabled:
+            return await _render_rows(cypher)
+        return await embed_result_cache.get_or_load(
+            (result_format, None, None, _source_key(cypher)), lambda: _render_rows(cypher)
+        )
+    source = _source_key(cypher, snapshot_id)
+    if cluster:
+        found, graph = embed_graph_cache.lookup(source)
+        check_cluster(cluster, graph.partitions if found else {})
+    if not embed_result_cache.enabled:
+        return await _render_graph(cypher, layout_key, cluster, snapshot_id)
+    return await embed_result_cache.get_or_load(
+        (result_format, layout_key, cluster, source),
+        lambda: _render_graph(cypher, layout_key, cluster, snapshot_id),
+    )
+
+
+def invalidate_snapshot_results(snapshot_id) -> int:
+    """Drop this worker's cached results rendered from a snapshot (call after refreshing it)."""
+    source = _source_key(None, snapshot_id)
+    embed_graph_cache.invalidate(source)
+    return embed_result_cache.invalidate_where(lambda key: key[-1] == source)
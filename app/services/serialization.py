@@ -0,0 +1,47 @@
+import orjson
+from neo4j.spatial import Point
+from neo4j.time import Date, DateTime, Duration, Time
+
+# Streamed bodies are flushed in chunks of roughly this size rather than per record.
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def encode_default(obj):
+    """Encoder hook for values JSON has no type for, also used for MessagePack.
+
+    Neo4j temporal values become ISO 8601 strings (nanosecond precision),
+    points ``{srid, x, y[, z]}``; anything else falls back to ``str()``.
+    """
+    if isinstance(obj, (Date, DateTime, Time, Duration)):
+        return obj.iso_format()
+    if isinstance(obj, Point):
+        point = {"srid": obj.srid, "x": obj.x, "y": obj.y}
+        if len(obj) > 2:
+            point["z"] = obj.z
+        return point
+    return str(obj)
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON encoding for response bodies, via orjson.
+
+    Used instead of FastAPI's ``jsonable_encoder`` + ``json`` path, which walks
+    (and for ``response_model`` routes re-validates) every value first.
+    """
+    return orjson.dumps(obj, default=encode_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+async def coalesce_chunks(parts, chunk_bytes: int = STREAM_CHUNK_BYTES):
+    """Re-chunk an async iterator of small byte strings into writes of about ``chunk_bytes``."""
+    buffer, size = [], 0
+    try:
+        async for part in parts:
+            buffer.append(part)
+            size += len(part)
+            if size >= chunk_bytes:
+                yield b"".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield b"".join(buffer)
+    finally:
+        await parts.aclose()
@@ -0,0 +1,43 @@
+import asyncio
+import gzip
+import uuid
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.db.crud import load_snapshot
+from app.db.models import EmbedSnapshot
+from app.db.session import get_session
+from app.services.neo4j_service import GRAPH, run_cypher
+from app.services.serialization import dumps
+
+SNAPSHOT_ENCODING = "gzip"
+
+
+def _compress(data) -> tuple:
+    raw = dumps(data)
+    return gzip.compress(raw, compresslevel=6), len(raw)
+
+
+async def capture_snapshot(cypher: str) -> EmbedSnapshot:
+    """Run ``cypher`` once and return its graph-format result as an unsaved, gzip-compressed snapshot row.
+
+    Raises 413 when the compressed result exceeds ``EMBED_SNAPSHOT_MAX_BYTES``.
+    """
+    data = await run_cypher(cypher, {}, GRAPH)
+    body, size = await asyncio.to_thread(_compress, data)
+    if settings.EMBED_SNAPSHOT_MAX_BYTES > 0 and len(body) > settings.EMBED_SNAPSHOT_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Snapshot is {len(body)} bytes compressed; the limit is {settings.EMBED_SNAPSHOT_MAX_BYTES}",
+        )
+    return EmbedSnapshot(result_format=GRAPH, content_encoding=SNAPSHOT_ENCODING, body=body, size=size)
+
+
+async def read_snapshot(embed_token_id: uuid.UUID) -> bytes:
+    """The stored graph-format result of a snapshot embed, serialized as ``dumps(run_cypher(...))`` would be."""
+    async with get_session() as session:
+        snapshot = await load_snapshot(session, embed_token_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return await asyncio.to_thread(gzip.decompress, snapshot.body)
@@ -0,0 +1,196 @@
+import re
+from collections import Counter, defaultdict
+
+from fastapi import HTTPException
+
+from app.config import settings
+
+# Clustering methods for graphs above the node budget.
+LABEL = "label"
+COMMUNITY = "community"
+
+# Separates nested cluster ids in a drill-down path, e.g. "c3.c0".
+PATH_SEPARATOR = "."
+
+CLUSTER_PATH = re.compile(r"c(?:0|[1-9]\d*)(?:\.c(?:0|[1-9]\d*))*")
+
+
+def _label_groups(nodes: list) -> dict:
+    groups = defaultdict(list)
+    for node in nodes:
+        groups[":".join(node["labels"])].append(node["id"])
+    return groups
+
+
+def _communities(nodes: list, relationships: list, iterations: int = 20) -> dict:
+    """Label propagation: every node repeatedly adopts its neighbours' most common community.
+
+    Nodes are visited in id order and ties go to the smallest community id,
+    so the same graph always yields the same communities.
+    """
+    node_ids = sorted(node["id"] for node in nodes)
+    neighbours = {node_id: [] for node_id in node_ids}
+    for rel in relationships:
+        start, end = rel["startNode"], rel["endNode"]
+        if start != end and start in neighbours and end in neighbours:
+            neighbours[start].append(end)
+            neighbours[end].append(start)
+    community = {node_id: node_id for node_id in node_ids}
+    for _ in range(iterations):
+        changed = False
+        for node_id in node_ids:
+            if not neighbours[node_id]:
+                continue
+            counts = Counter(community[other] for other in neighbours[node_id])
+            best = max(counts.values())
+            choice = min(candidate for candidate, count in counts.items() if count == best)
+            if choice != community[node_id]:
+                community[node_id] = choice
+                changed = True
+        if not changed:
+            break
+    groups = defaultdict(list)
+    for node_id in node_ids:
+        groups[community[node_id]].append(node_id)
+    return groups
+
+
+def cluster_nodes(graph: dict, method: str = None, max_clusters: int = None) -> list:
+    """Partition the nodes of a graph-format result into at most ``max_clusters`` lists of node ids.
+
+    Clusters are ordered largest first. Those beyond the limit, and
+    single-node communities, are merged into one trailing cluster. A method
+    that cannot split the graph (one label, one community) falls back to the
+    next: label, then community, then fixed-size chunks in id order.
+    """
+    method = method or settings.EMBED_SUMMARY_METHOD
+    max_clusters = max(2, max_clusters or settings.EMBED_SUMMARY_MAX_CLUSTERS)
+    nodes = graph["nodes"]
+    groups = list(_label_groups(nodes).values()) if method == LABEL else []
+    if len(groups) < 2:
+        communities = _communities(nodes, graph["relationships"]).values()
+        groups = [group for group in communities if len(group) > 1]
+        singletons = [group[0] for group in communities if len(group) == 1]
+        if singletons:
+            groups.append(singletons)
+    if len(groups) < 2:
+        node_ids = sorted(node["id"] for node in nodes)
+        size = -(-len(node_ids) // max_clusters)
+        groups = [node_ids[i:i + size] for i in range(0, len(node_ids), size)]
+    groups.sort(key=lambda group: (-len(group), min(group)))
+    if len(groups) > max_clusters:
+        rest = [node_id for group in groups[max_clusters - 1:] for node_id in group]
+        groups = groups[:max_clusters - 1] + [rest]
+    return groups
+
+
+def subgraph(graph: dict, node_ids) -> dict:
+    """The given nodes and the relationships between them."""
+    node_ids = set(node_ids)
+    return {
+        "nodes": [node for node in graph["nodes"] if node["id"] in node_ids],
+        "relationships": [
+            rel for rel in graph["relationships"] if rel["startNode"] in node_ids and rel["endNode"] in node_ids
+        ],
+    }
+
+
+def _cluster_id(parent: str, index: int) -> str:
+    return f"{parent}{PATH_SEPARATOR}c{index}" if parent else f"c{index}"
+
+
+def coarse_graph(graph: dict, groups: list, parent: str = "") -> dict:
+    """One node per cluster and one relationship per connected pair of clusters, with counts."""
+    labels = {node["id"]: node["labels"] for node in graph["nodes"]}
+    membership = {}
+    nodes = []
+    for index, group in enumerate(groups):
+        cluster_id = _cluster_id(parent, index)
+        label_counts = Counter(label for node_id in group for label in labels[node_id])
+        top_labels = [label for label, _ in label_counts.most_common(3)]
+        nodes.append({
+            "id": "cluster:" + cluster_id,
+            "labels": top_labels,
+            "properties": {"name": f"{'/'.join(top_labels) or 'Nodes'} ({len(group)})", "size": len(group)},
+            "cluster": {"id": cluster_id, "size": len(group), "relationships": 0},
+        })
+        membership.update((node_id, index) for node_id in group)
+    links = defaultdict(Counter)
+    for rel in graph["relationships"]:
+        start, end = membership.get(rel["startNode"]), membership.get(rel["endNode"])
+        if start is None or end is None:
+            continue
+        if start == end:
+            nodes[start]["cluster"]["relationships"] += 1
+        else:
+            links[(start, end)][rel["type"]] += 1
+    relationships = []
+    for (start, end), types in sorted(links.items()):
+        relationships.append({
+            "id": f"cluster:{_cluster_id(parent, start)}->{_cluster_id(parent, end)}",
+            "type": next(iter(types)) if len(types) == 1 else "RELATED",
+            "startNode": nodes[start]["id"],
+            "endNode": nodes[end]["id"],
+            "properties": {"count": sum(types.values()), "types": dict(types)},
+        })
+    return {"nodes": nodes, "relationships": relationships}
+
+
+def _not_found() -> HTTPException:
+    return HTTPException(status_code=404, detail="Cluster not found")
+
+
+def _partition(graph: dict, path: str, budget: int, partitions: dict):
+    if path not in partitions:
+        partitions[path] = None if budget <= 0 or len(graph["nodes"]) <= budget else cluster_nodes(graph)
+    return partitions[path]
+
+
+def check_cluster(cluster: str, partitions: dict):
+    """Raise 404 for a drill-down path that is malformed or ruled out by already computed ``partitions``."""
+    if not CLUSTER_PATH.fullmatch(cluster):
+        raise _not_found()
+    parent = ""
+    for segment in cluster.split(PATH_SEPARATOR):
+        if parent not in partitions:
+            return
+        groups = partitions[parent]
+        if groups is None or int(segment[1:]) >= len(groups):
+            raise _not_found()
+        parent = _cluster_id(parent, int(segment[1:]))
+
+
+def level_of_detail(graph: dict, cluster: str = None, budget: int = None, partitions: dict = None) -> dict:
+    """Bound a graph-format result to ``budget`` nodes, descending into ``cluster`` first.
+
+    ``cluster`` is a drill-down path of cluster ids from earlier coarse
+    graphs. A graph within the budget is returned as is; a larger one is
+    replaced by its coarse graph, with a ``summary`` entry describing what
+    was collapsed. Clustering is deterministic, so the same result always
+    yields the same cluster ids. ``partitions`` memoizes the clusters of each
+    level by path (None for a level within the budget) across calls on the
+    same result.
+    """
+    budget = settings.EMBED_SUMMARY_NODE_BUDGET if budget is None else budget
+    partitions = {} if partitions is None else partitions
+    if cluster:
+        check_cluster(cluster, partitions)
+    parent = ""
+    for segment in cluster.split(PATH_SEPARATOR) if cluster else []:
+        groups = _partition(graph, parent, budget, partitions)
+        index = int(segment[1:])
+        if groups is None or index >= len(groups):
+            raise _not_found()
+        graph = subgraph(graph, groups[index])
+        parent = _cluster_id(parent, index)
+    groups = _partition(graph, parent, budget, partitions)
+    if groups is None:
+        return graph
+    coarse = coarse_graph(graph, groups, parent=parent)
+    coarse["summary"] = {
+        "cluster": cluster,
+        "totalNodes": len(graph["nodes"]),
+        "totalRelationships": len(graph["relationships"]),
+        "clusters": len(coarse["nodes"]),
+    }
+    return coarse
@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Variants tried in order; the first one the client accepts (q > 0) is served.
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: intermediaries may downgrade our strong ETags to W/"...".
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+class PrecompressedAsset:
+    """A body held in memory with gzip (and, if available, brotli) variants and strong ETags.
+
+    Static files use maximum compression once at startup; pages rendered per
+    request pass ``fast=True`` to trade a little size for compression speed.
+    """
+
+    def __init__(self, body: bytes, media_type: str, fast: bool = False):
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {"identity": (body, f'"{digest}"')}
+        compressed = {"gzip": gzip.compress(body, compresslevel=6 if fast else 9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=5 if fast else 11)
+        for encoding, data in compressed.items():
+            # Each representation needs its own strong ETag.
+            if len(data) < len(body):
+                self.variants[encoding] = (data, f'"{digest}-{encoding}"')
+
+    @classmethod
+    def from_path(cls, path: Path) -> "PrecompressedAsset":
+        return cls(path.read_bytes(), mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body, _ in self.variants.values())
+
+    def select_encoding(self, accept_encoding: str) -> str:
+        # Like common servers, take the smallest acceptable variant rather than ranking by q.
+        accepted = _accepted_encodings(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        for encoding in ENCODING_PREFERENCE:
+            if encoding in self.variants and accepted.get(encoding, wildcard) > 0:
+                return encoding
+        return "identity"
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        encoding = self.select_encoding(request.headers.get("accept-encoding", ""))
+        body, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+class PrecompressedAssets:
+    """Registry of precompressed files from one directory, loaded once per process."""
+
+    def __init__(self, directory: str, pattern: str = "*.html"):
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self._assets: Optional[Dict[str, PrecompressedAsset]] = None
+
+    def load(self):
+        self._assets = {
+            path.name: PrecompressedAsset.from_path(path) for path in sorted(self.directory.glob(self.pattern))
+        }
+
+    def get(self, name: str) -> Optional[PrecompressedAsset]:
+        if self._assets is None:
+            self.load()
+        return self._assets.get(name)
+
+    def response(self, request: Request, name: str, cache_control: str) -> Response:
+        asset = self.get(name)
+        if asset is None:
+            return Response(status_code=404)
+        return asset.response(request, cache_control)
+
+
+public_assets = PrecompressedAssets(settings.STATIC_DIRECTORY)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves registered assets from memory, compressed and cacheable."""
+
+    def __init__(self, *args, assets: PrecompressedAssets, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.assets = assets
+
+    async def get_response(self, path: str, scope) -> Response:
+        asset = self.assets.get(path)
+        if asset is not None and scope["method"] in ("GET", "HEAD"):
+            return asset.response(Request(scope), f"public, max-age={settings.STATIC_MAX_AGE}")
+        return await super().get_response(path, scope)
@@ -0,0 +1,32 @@
+"""embed_tokens
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases set up before migrations existed already have this table.
+    if sa.inspect(op.get_bind()).has_table("embed_tokens"):
+        return
+    op.create_table(
+        "embed_tokens",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("embed_token", sa.String(), nullable=False, unique=True),
+        sa.Column("cypher_query", sa.Text(), nullable=False),
+        sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("embed_tokens")
@@ -0,0 +1,42 @@
+"""embed_snapshots
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "embed_tokens",
+        sa.Column("snapshot", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.create_table(
+        "embed_snapshots",
+        sa.Column(
+            "embed_token_id",
+            UUID(as_uuid=True),
+            sa.ForeignKey("embed_tokens.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("result_format", sa.String(), nullable=False),
+        sa.Column("content_encoding", sa.String(), nullable=False),
+        sa.Column("body", sa.LargeBinary(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("refreshed_at", sa.TIMESTAMP(timezone=True), nullable=False),
+    )
+    # Snapshot bodies are already gzip-compressed; skip TOAST's own compression.
+    op.execute("ALTER TABLE embed_snapshots ALTER COLUMN body SET STORAGE EXTERNAL")
+
+
+def downgrade():
+    op.drop_table("embed_snapshots")
+    op.drop_column("embed_tokens", "snapshot")
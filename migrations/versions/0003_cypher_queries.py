@@ -0,0 +1,93 @@
+"""cypher_queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+
+from app.services.cypher import normalize_cypher, query_hash
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+cypher_queries = sa.table(
+    "cypher_queries",
+    sa.column("query_hash", sa.String),
+    sa.column("cypher_query", sa.Text),
+    sa.column("created_at", sa.TIMESTAMP(timezone=True)),
+)
+query_hash_backfill = sa.table(
+    "query_hash_backfill",
+    sa.column("cypher_query", sa.Text),
+    sa.column("query_hash", sa.String),
+)
+BACKFILL_BATCH = 5000
+
+
+def upgrade():
+    op.create_table(
+        "cypher_queries",
+        sa.Column("query_hash", sa.String(64), primary_key=True),
+        sa.Column("cypher_query", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+    )
+    op.add_column("embed_tokens", sa.Column("query_hash", sa.String(64), nullable=True))
+
+    # Hashing needs the application's normalization, so digests are computed here and
+    # joined back in a single UPDATE; cypher_query is unindexed, so per-text updates
+    # would scan embed_tokens once per distinct query.
+    bind = op.get_bind()
+    texts = bind.execute(sa.text("SELECT DISTINCT cypher_query FROM embed_tokens")).scalars().all()
+    hashes = [{"cypher_query": text, "query_hash": query_hash(text)} for text in texts]
+    # Texts that differ only in formatting share one cypher_queries row.
+    queries = {row["query_hash"]: normalize_cypher(row["cypher_query"]) for row in hashes}
+    rows = [
+        {"query_hash": digest, "cypher_query": text, "created_at": sa.func.now()} for digest, text in queries.items()
+    ]
+    bind.execute(
+        sa.text(
+            "CREATE TEMPORARY TABLE query_hash_backfill (cypher_query TEXT NOT NULL, query_hash VARCHAR(64) NOT NULL) "
+            "ON COMMIT DROP"
+        )
+    )
+    # Batched to stay under the driver's bind parameter limit.
+    for start in range(0, len(hashes), BACKFILL_BATCH):
+        bind.execute(sa.insert(query_hash_backfill).values(hashes[start:start + BACKFILL_BATCH]))
+    for start in range(0, len(rows), BACKFILL_BATCH):
+        bind.execute(
+            insert(cypher_queries)
+            .values(rows[start:start + BACKFILL_BATCH])
+            .on_conflict_do_nothing(index_elements=["query_hash"])
+        )
+    bind.execute(sa.text("ANALYZE query_hash_backfill"))
+    bind.execute(
+        sa.text(
+            "UPDATE embed_tokens t SET query_hash = m.query_hash "
+            "FROM query_hash_backfill m WHERE t.cypher_query = m.cypher_query"
+        )
+    )
+
+    op.alter_column("embed_tokens", "query_hash", nullable=False)
+    op.create_foreign_key(
+        "embed_tokens_query_hash_fkey", "embed_tokens", "cypher_queries", ["query_hash"], ["query_hash"]
+    )
+    op.create_index("ix_embed_tokens_query_hash", "embed_tokens", ["query_hash"])
+    op.drop_column("embed_tokens", "cypher_query")
+
+
+def downgrade():
+    op.add_column("embed_tokens", sa.Column("cypher_query", sa.Text(), nullable=True))
+    op.execute(
+        "UPDATE embed_tokens SET cypher_query = q.cypher_query "
+        "FROM cypher_queries q WHERE q.query_hash = embed_tokens.query_hash"
+    )
+    op.alter_column("embed_tokens", "cypher_query", nullable=False)
+    op.drop_index("ix_embed_tokens_query_hash", table_name="embed_tokens")
+    op.drop_constraint("embed_tokens_query_hash_fkey", "embed_tokens", type_="foreignkey")
+    op.drop_column("embed_tokens", "query_hash")
+    op.drop_table("cypher_queries")
@@ -0,0 +1,92 @@
+"""partition embed_tokens weekly by expires_at
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-15
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.config import settings
+from app.db.partitions import DEFAULT_PARTITION, WEEK, create_partition_statements, week_start
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, embed_token, query_hash, expires_at, created_at, snapshot"
+
+
+def _columns():
+    return [
+        sa.Column("id", UUID(as_uuid=True), nullable=False),
+        sa.Column("embed_token", sa.String(), nullable=False),
+        sa.Column("query_hash", sa.String(64), sa.ForeignKey("cypher_queries.query_hash"), nullable=False),
+        sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("snapshot", sa.Boolean(), nullable=False, server_default=sa.false()),
+    ]
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Foreign keys into a partitioned table would block dropping its partitions.
+    op.drop_constraint("embed_snapshots_embed_token_id_fkey", "embed_snapshots", type_="foreignkey")
+
+    op.rename_table("embed_tokens", "embed_tokens_unpartitioned")
+    op.execute("ALTER INDEX embed_tokens_pkey RENAME TO embed_tokens_unpartitioned_pkey")
+    op.drop_index("ix_embed_tokens_query_hash", table_name="embed_tokens_unpartitioned")
+
+    op.create_table(
+        "embed_tokens",
+        *_columns(),
+        sa.PrimaryKeyConstraint("id", "expires_at", name="embed_tokens_pkey"),
+        postgresql_partition_by="RANGE (expires_at)",
+    )
+    op.create_index("ix_embed_tokens_embed_token", "embed_tokens", ["embed_token"])
+    op.create_index("ix_embed_tokens_query_hash", "embed_tokens", ["query_hash"])
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF embed_tokens DEFAULT")
+
+    # Rows land in the default partition, then move into their weekly partitions as those are created.
+    op.execute(f"INSERT INTO embed_tokens ({COLUMNS}) SELECT {COLUMNS} FROM embed_tokens_unpartitioned")
+    op.drop_table("embed_tokens_unpartitioned")
+
+    oldest = bind.execute(sa.text(f"SELECT min(expires_at) FROM {DEFAULT_PARTITION}")).scalar()
+    current = week_start(datetime.now(timezone.utc))
+    start = min(week_start(oldest), current) if oldest is not None else current
+    while start <= current + WEEK * settings.EMBED_TOKEN_PARTITION_WEEKS_AHEAD:
+        for statement in create_partition_statements(start):
+            bind.exec_driver_sql(statement)
+        start += WEEK
+
+
+def downgrade():
+    op.rename_table("embed_tokens", "embed_tokens_partitioned")
+    op.execute("ALTER INDEX embed_tokens_pkey RENAME TO embed_tokens_partitioned_pkey")
+    op.drop_index("ix_embed_tokens_query_hash", table_name="embed_tokens_partitioned")
+    op.drop_index("ix_embed_tokens_embed_token", table_name="embed_tokens_partitioned")
+
+    op.create_table(
+        "embed_tokens",
+        *_columns(),
+        sa.PrimaryKeyConstraint("id", name="embed_tokens_pkey"),
+        sa.UniqueConstraint("embed_token", name="embed_tokens_embed_token_key"),
+    )
+    op.create_index("ix_embed_tokens_query_hash", "embed_tokens", ["query_hash"])
+    op.execute(f"INSERT INTO embed_tokens ({COLUMNS}) SELECT {COLUMNS} FROM embed_tokens_partitioned")
+    # Dropping the parent drops every partition with it.
+    op.drop_table("embed_tokens_partitioned")
+
+    op.execute("DELETE FROM embed_snapshots s WHERE NOT EXISTS (SELECT 1 FROM embed_tokens t WHERE t.id = s.embed_token_id)")
+    op.create_foreign_key(
+        "embed_snapshots_embed_token_id_fkey",
+        "embed_snapshots",
+        "embed_tokens",
+        ["embed_token_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Compare the proxy response encoding paths on a synthetic Neo4j-like result.
+
+"fastapi" is what a returned dict used to go through: validation against
+ProxyQueryResponse, jsonable_encoder, then stdlib json. "orjson" is
+app.services.serialization.dumps, which the proxy and embed endpoints now use.
+
+Usage:
+  python scripts/bench_serialization.py --rows 20000 --repeat 5
+
+Run from the repository root (the app settings read .env).
+"""
+
+import argparse
+import json
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+from neo4j.spatial import WGS84Point
+from neo4j.time import DateTime
+
+from app.api.proxy import ProxyQueryResponse
+from app.services.serialization import dumps
+
+
+def make_rows(count: int) -> list:
+    rng = random.Random(42)
+    return [
+        {
+            "p": {"name": f"Person {i}", "born": rng.randint(1920, 2005), "score": rng.random(), "tags": ["a", "b"]},
+            "m": {"title": f"Movie {i % 500}", "released": rng.randint(1950, 2024), "rating": rng.random() * 10},
+            "seen": DateTime(2024, 1 + i % 12, 1 + i % 28, 12, 30, 15, 123456789),
+            "where": WGS84Point((rng.uniform(-180, 180), rng.uniform(-90, 90))),
+        }
+        for i in range(count)
+    ]
+
+
+def fastapi_path(payload: dict) -> bytes:
+    # Temporal/spatial values are pre-stringified: jsonable_encoder cannot encode them.
+    model = ProxyQueryResponse(**payload)
+    return json.dumps(jsonable_encoder(model), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def best_of(fn, payload, repeat: int):
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn(payload))
+        best = min(best, time.perf_counter() - start)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    payload = {"success": True, "data": rows}
+    stringified = {
+        "success": True,
+        "data": [{**row, "seen": row["seen"].iso_format(), "where": list(row["where"])} for row in rows],
+    }
+
+    baseline, baseline_size = best_of(fastapi_path, stringified, args.repeat)
+    fast, fast_size = best_of(dumps, payload, args.repeat)
+    print(f"rows={args.rows}")
+    print(f"fastapi: {baseline * 1000:8.1f} ms  {baseline_size / 1e6:6.2f} MB")
+    print(f"orjson:  {fast * 1000:8.1f} ms  {fast_size / 1e6:6.2f} MB")
+    print(f"speedup: {baseline / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
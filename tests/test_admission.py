@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+def controller(max_concurrent=1, max_queue=1, queue_timeout=1.0, per_client=0):
+    return AdmissionController(max_concurrent, max_queue, queue_timeout, per_client, retry_after=7)
+
+
+async def hold(admission, client, entered, release):
+    async with admission.admit(client):
+        entered.set()
+        await release.wait()
+
+
+def test_client_over_its_limit_gets_429():
+    async def scenario():
+        admission = controller(max_concurrent=2, per_client=1)
+        entered, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.ensure_future(hold(admission, "a", entered, release))
+        await entered.wait()
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with admission.admit("a"):
+                pass
+        # Other clients are unaffected.
+        async with admission.admit("b"):
+            pass
+        release.set()
+        await holder
+        async with admission.admit("a"):
+            pass
+        return rejected.value, admission.stats()
+
+    rejected, stats = asyncio.run(scenario())
+    assert rejected.status_code == 429 and rejected.headers["Retry-After"] == "7"
+    assert stats["rejected"]["clientLimit"] == 1
+    assert stats["active"] == 0 and stats["clients"] == 0
+
+
+def test_full_queue_gets_503():
+    async def scenario():
+        admission = controller(max_concurrent=1, max_queue=1)
+        entered, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.ensure_future(hold(admission, None, entered, release))
+        await entered.wait()
+        queued = asyncio.ensure_future(hold(admission, None, asyncio.Event(), release))
+        await asyncio.sleep(0)
+        assert admission.stats()["queueDepth"] == 1
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with admission.admit():
+                pass
+        release.set()
+        await asyncio.gather(holder, queued)
+        return rejected.value, admission.stats()
+
+    rejected, stats = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert stats["rejected"]["queueFull"] == 1
+    assert stats["active"] == 0 and stats["queueDepth"] == 0 and stats["admitted"] == 2
+
+
+def test_queue_timeout_gets_503_and_frees_the_client():
+    async def scenario():
+        admission = controller(max_concurrent=1, queue_timeout=0.01, per_client=1)
+        entered, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.ensure_future(hold(admission, "a", entered, release))
+        await entered.wait()
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with admission.admit("b"):
+                pass
+        stats = admission.stats()
+        release.set()
+        await holder
+        return rejected.value, stats
+
+    rejected, stats = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert stats["rejected"]["queueTimeout"] == 1
+    assert stats["queueDepth"] == 0 and stats["clients"] == 1
+
+
+def test_slot_and_client_released_after_an_exception():
+    async def scenario():
+        admission = controller(max_concurrent=1, per_client=1)
+        with pytest.raises(RuntimeError):
+            async with admission.admit("a"):
+                raise RuntimeError("query failed")
+        stats = admission.stats()
+        # Slot and client count were returned, so the same client is admitted at once.
+        async with admission.admit("a"):
+            pass
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0 and stats["clients"] == 0
+
+
+def test_slot_and_client_released_after_cancellation():
+    async def scenario():
+        admission = controller(max_concurrent=1, max_queue=1, per_client=1)
+        entered, release = asyncio.Event(), asyncio.Event()
+        running = asyncio.ensure_future(hold(admission, "a", entered, release))
+        await entered.wait()
+        queued = asyncio.ensure_future(hold(admission, "b", asyncio.Event(), release))
+        await asyncio.sleep(0)
+        # Cancel one request while it waits for a slot and one while it holds a slot.
+        queued.cancel()
+        running.cancel()
+        await asyncio.gather(running, queued, return_exceptions=True)
+        stats = admission.stats()
+        async with admission.admit("a"):
+            pass
+        async with admission.admit("b"):
+            pass
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0 and stats["queueDepth"] == 0 and stats["clients"] == 0
+
+
+def test_disabled_controller_admits_everything():
+    async def scenario():
+        admission = controller(max_concurrent=0, per_client=1)
+        async with admission.admit("a"):
+            async with admission.admit("a"):
+                pass
+        return admission.stats()
+
+    stats = asyncio.run(scenario())
+    assert not stats["enabled"] and stats["rejected"]["clientLimit"] == 0
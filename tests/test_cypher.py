@@ -0,0 +1,137 @@
+import pytest
+
+from app.services.cypher import AMBIGUOUS, READ, WRITE, classify_query, is_read_only, window_final_return
+
+
+def test_appends_window_to_final_return():
+    cypher, params = window_final_return("MATCH (n) RETURN n", {}, skip=10, limit=5)
+    assert cypher == "MATCH (n) RETURN n SKIP $_rowSkip LIMIT $_rowLimit"
+    assert params == {"_rowSkip": 10, "_rowLimit": 5}
+
+
+def test_trailing_line_comment_is_not_extended():
+    cypher, params = window_final_return("MATCH (n) RETURN n // all", {}, limit=2)
+    assert cypher == "MATCH (n) RETURN n SKIP $_rowSkip LIMIT $_rowLimit"
+    assert params == {"_rowSkip": 0, "_rowLimit": 2}
+
+
+def test_comment_after_existing_limit():
+    cypher, params = window_final_return("MATCH (n) RETURN n LIMIT 10 // c", {}, limit=50)
+    assert cypher == "MATCH (n) RETURN n SKIP $_rowSkip LIMIT $_rowLimit"
+    assert params["_rowLimit"] == 10
+
+
+def test_block_comment_and_keywords_in_literals():
+    cypher, _ = window_final_return("MATCH (n) /* RETURN x LIMIT 1 */ WHERE n.s = 'LIMIT 3' RETURN n;", {}, limit=1)
+    assert cypher == "MATCH (n) WHERE n.s = 'LIMIT 3' RETURN n SKIP $_rowSkip LIMIT $_rowLimit"
+
+
+def test_combines_with_existing_skip_and_limit():
+    cypher, params = window_final_return("MATCH (n) RETURN n ORDER BY n.id SKIP 5 LIMIT $max", {"max": 20}, skip=8, limit=10)
+    assert cypher == "MATCH (n) RETURN n ORDER BY n.id SKIP $_rowSkip LIMIT $_rowLimit"
+    assert params == {"max": 20, "_rowSkip": 13, "_rowLimit": 10}
+
+
+def test_window_past_existing_limit_is_empty():
+    _, params = window_final_return("MATCH (n) RETURN n LIMIT 10", {}, skip=15, limit=5)
+    assert params["_rowLimit"] == 0
+
+
+def test_subquery_return_and_limit_are_ignored():
+    cypher, params = window_final_return(
+        "MATCH (p) CALL { WITH p MATCH (p)--(f) RETURN f LIMIT 3 } RETURN p, f", {}, limit=100
+    )
+    assert cypher.endswith("RETURN p, f SKIP $_rowSkip LIMIT $_rowLimit")
+    assert "RETURN f LIMIT 3 }" in cypher
+    assert params["_rowLimit"] == 100
+
+
+def test_property_named_like_keyword_is_not_a_clause():
+    cypher, _ = window_final_return("MATCH (n) RETURN n.limit, $skip", {"skip": 1}, limit=5)
+    assert cypher == "MATCH (n) RETURN n.limit, $skip SKIP $_rowSkip LIMIT $_rowLimit"
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "MATCH (a) RETURN a.name AS name UNION MATCH (b) RETURN b.name AS name",
+        "MATCH (a) RETURN a UNION ALL MATCH (b) RETURN b",
+    ],
+)
+def test_union_is_rejected(query):
+    with pytest.raises(ValueError):
+        window_final_return(query, {}, limit=10)
+
+
+def test_query_without_return_is_rejected():
+    with pytest.raises(ValueError):
+        window_final_return("CREATE (n:Person)", {}, limit=10)
+
+
+def test_computed_limit_is_rejected():
+    with pytest.raises(ValueError):
+        window_final_return("MATCH (n) RETURN n LIMIT 1 + 2", {}, limit=10)
+
+
+def test_reserved_parameter_names_are_rejected():
+    with pytest.raises(ValueError):
+        window_final_return("MATCH (n) RETURN n", {"_rowSkip": 1}, limit=10)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "MATCH (n) RETURN n",
+        "OPTIONAL MATCH (n) RETURN n",
+        "  with 1 AS x RETURN x",
+        "UNWIND [1, 2] AS x RETURN x",
+        "RETURN 1",
+        "SHOW DATABASES",
+        "CALL { MATCH (n) RETURN n } RETURN n",
+        "CALL\n  { MATCH (n) RETURN n } RETURN n",
+        "MATCH (n:Create)-[:SET]->(m) WHERE n.set = $delete RETURN {merge: 1}, 'CREATE'",
+        "MATCH (n) // CREATE (m)\nRETURN n",
+    ],
+)
+def test_read_only_queries(query):
+    assert is_read_only(query)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "CREATE (n:Person)",
+        "MATCH (n) SET n.x = 1",
+        "MATCH (n) DETACH DELETE n",
+        "MATCH (n) CALL { WITH n CREATE (m) } RETURN n",
+        "INSERT (:Person {name: 'a'})",
+        "MATCH (a) INSERT (a)-[:KNOWS]->(:Person)",
+        "GRANT ROLE reader TO alice",
+        "DENY READ {*} ON GRAPH * TO role",
+        "REVOKE ROLE reader FROM alice",
+        "CALL db.labels()",
+        "MATCH (n) CALL apoc.create.node(['X'], {}) YIELD node RETURN node",
+        "USE neo4j MATCH (n) RETURN n",
+        "LOAD CSV FROM 'file:///x.csv' AS row RETURN row",
+    ],
+)
+def test_queries_that_may_write(query):
+    assert not is_read_only(query)
+
+
+@pytest.mark.parametrize(
+    "query, kind",
+    [
+        ("MATCH (n) RETURN n", READ),
+        ("MATCH (n) WHERE n.set = 1 RETURN n", READ),
+        ("CREATE (n)", WRITE),
+        ("MATCH (n) MERGE (m {id: n.id})", WRITE),
+        ("GRANT ROLE reader TO alice", WRITE),
+        ("CALL db.labels()", AMBIGUOUS),
+        ("MATCH (n) CALL apoc.path.expand(n, '', '', 1, 2) YIELD path RETURN path", AMBIGUOUS),
+        ("CALL apoc.create.node(['X'], {}) YIELD node SET node.x = 1", WRITE),
+        ("USE neo4j MATCH (n) RETURN n", AMBIGUOUS),
+    ],
+)
+def test_classify_query(query, kind):
+    assert classify_query(query) == kind
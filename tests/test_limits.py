@@ -0,0 +1,31 @@
+from app.services import limits
+from app.services.limits import ResultGuard
+
+
+def test_byte_cap_counts_uneven_rows():
+    # Small rows at the start and every 32nd row, large ones in between: the cap must still hold.
+    guard = ResultGuard(max_rows=0, max_bytes=10 * 1024 * 1024)
+    rows = 0
+    while not guard.exhausted():
+        rows += 1
+        small = rows <= 32 or rows % 32 == 0
+        guard.add({"value": "x" if small else "x" * 1024 * 1024})
+    assert guard.truncated
+    assert rows == 42
+    assert guard.bytes < 11 * 1024 * 1024
+
+
+def test_byte_cap_stops_the_result():
+    guard = ResultGuard(max_rows=0, max_bytes=100)
+    while not guard.exhausted():
+        guard.add({"value": "x" * 20})
+    assert guard.truncated and guard.rows == 4
+
+
+def test_encoded_records_are_not_serialized_again(monkeypatch):
+    monkeypatch.setattr(limits, "dumps", lambda value: 1 / 0)
+    guard = ResultGuard(max_rows=0, max_bytes=25)
+    guard.add_encoded(20)
+    assert not guard.exhausted()
+    guard.add_encoded(20)
+    assert guard.exhausted() and guard.bytes == 40
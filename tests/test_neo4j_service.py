@@ -0,0 +1,16 @@
+from app.config import settings
+from app.services.neo4j_service import query_timeout
+
+
+def test_zero_default_timeout_means_none(monkeypatch):
+    monkeypatch.setattr(settings, "NEO4J_QUERY_TIMEOUT_SECONDS", 0)
+    monkeypatch.setattr(settings, "NEO4J_MAX_QUERY_TIMEOUT_SECONDS", 300)
+    assert query_timeout() is None
+    assert query_timeout(10) == 10
+    assert query_timeout(1000) == 300
+
+
+def test_default_timeout_is_not_capped(monkeypatch):
+    monkeypatch.setattr(settings, "NEO4J_QUERY_TIMEOUT_SECONDS", 600)
+    monkeypatch.setattr(settings, "NEO4J_MAX_QUERY_TIMEOUT_SECONDS", 300)
+    assert query_timeout() == 600
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+from app.db.partitions import (
+    DEFAULT_PARTITION,
+    create_partition_statements,
+    drop_partition_statements,
+    partition_start,
+    plan,
+    week_start,
+)
+
+DAY = 24 * 60 * 60
+# A Thursday.
+NOW = datetime(2026, 10, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_week_start_is_monday_midnight_utc():
+    assert week_start(NOW) == utc(2026, 10, 12)
+    assert week_start(utc(2026, 10, 12)) == utc(2026, 10, 12)
+    assert week_start(utc(2026, 10, 18, 23, 59, 59)) == utc(2026, 10, 12)
+    # Monday 01:00 at UTC+2 is still Sunday in UTC.
+    assert week_start(datetime(2026, 10, 19, 1, 0, tzinfo=timezone(timedelta(hours=2)))) == utc(2026, 10, 12)
+
+
+def test_partition_start_only_accepts_generated_names():
+    assert partition_start("embed_tokens_p20261012") == utc(2026, 10, 12)
+    for name in (DEFAULT_PARTITION, "embed_tokens_p2026011", "embed_tokens_p20261012_old", "other_p20261012"):
+        assert partition_start(name) is None
+
+
+def test_plan_creates_missing_weeks_ahead():
+    create, drop = plan(["embed_tokens_p20261012", "embed_tokens_p20261026"], NOW, weeks_ahead=3, retention=7 * DAY)
+    assert create == [utc(2026, 10, 19), utc(2026, 11, 2)]
+    assert drop == []
+
+
+def test_plan_drops_weeks_past_retention():
+    existing = [
+        DEFAULT_PARTITION,
+        "embed_tokens_p20260921",
+        "embed_tokens_p20260928",  # ended 2026-10-05, more than 7 days before NOW
+        "embed_tokens_p20261005",  # ends 2026-10-12, within retention
+        "embed_tokens_p20261012",
+    ]
+    create, drop = plan(existing, NOW, weeks_ahead=0, retention=7 * DAY)
+    assert create == []
+    assert drop == ["embed_tokens_p20260921", "embed_tokens_p20260928"]
+
+
+def test_plan_drops_a_week_ending_exactly_at_the_cutoff():
+    _, drop = plan(["embed_tokens_p20261005"], utc(2026, 10, 19), weeks_ahead=0, retention=7 * DAY)
+    assert drop == ["embed_tokens_p20261005"]
+    _, drop = plan(["embed_tokens_p20261005"], utc(2026, 10, 19) - timedelta(seconds=1), weeks_ahead=0, retention=7 * DAY)
+    assert drop == []
+
+
+def test_create_statements_move_rows_then_attach():
+    create, move, attach = create_partition_statements(utc(2026, 10, 12))
+    assert create.startswith("CREATE TABLE embed_tokens_p20261012 ")
+    assert f"DELETE FROM {DEFAULT_PARTITION}" in move and "INSERT INTO embed_tokens_p20261012" in move
+    assert "'2026-10-12T00:00:00+00:00'" in move and "'2026-10-19T00:00:00+00:00'" in move
+    assert attach.startswith("ALTER TABLE embed_tokens ATTACH PARTITION embed_tokens_p20261012 FOR VALUES FROM")
+
+
+def test_drop_statements_delete_snapshots_then_detach_then_drop():
+    snapshots, drop = drop_partition_statements("embed_tokens_p20261012")
+    assert snapshots == ["DELETE FROM embed_snapshots WHERE embed_token_id IN (SELECT id FROM embed_tokens_p20261012)"]
+    assert drop == [
+        "ALTER TABLE embed_tokens DETACH PARTITION embed_tokens_p20261012",
+        "DROP TABLE embed_tokens_p20261012",
+    ]
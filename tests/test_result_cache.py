@@ -0,0 +1,65 @@
+import asyncio
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services import result_cache
+
+
+def _graph(size: int) -> dict:
+    labels = ["A", "B", "C"]
+    return {
+        "nodes": [{"id": str(i), "labels": [labels[i % 3]], "properties": {}} for i in range(size)],
+        "relationships": [],
+    }
+
+
+@pytest.fixture
+def executions(monkeypatch):
+    calls = []
+
+    async def fake_run_cypher(cypher, params, result_format=None, *args):
+        calls.append(cypher)
+        return _graph(30)
+
+    monkeypatch.setattr(result_cache, "run_cypher", fake_run_cypher)
+    monkeypatch.setattr(settings, "EMBED_SUMMARY_NODE_BUDGET", 5)
+    for cache in (result_cache.embed_result_cache, result_cache.embed_graph_cache):
+        monkeypatch.setattr(cache, "_cache", type(cache._cache)(max_size=16, ttl=60, max_weight=1 << 20, weigh=cache._cache._weigh))
+    return calls
+
+
+def test_cluster_views_share_one_execution(executions):
+    async def scenario():
+        coarse = orjson.loads(await result_cache.load_embed_result("q", "graph"))
+        ids = [node["cluster"]["id"] for node in coarse["data"]["nodes"]]
+        for cluster in ids:
+            await result_cache.load_embed_result("q", "graph", cluster=cluster)
+        nested = orjson.loads(await result_cache.load_embed_result("q", "graph", cluster=ids[0]))
+        return ids, nested
+
+    ids, nested = asyncio.run(scenario())
+    assert ids == ["c0", "c1", "c2"]
+    assert nested["data"]["summary"]["cluster"] == "c0"
+    assert len(executions) == 1
+
+
+@pytest.mark.parametrize("cluster", ["c9999", "c0.c9999.c1", "x", "c01"])
+def test_unknown_clusters_do_not_rerun_the_query(executions, cluster):
+    async def scenario():
+        await result_cache.load_embed_result("q", "graph")
+        for _ in range(3):
+            with pytest.raises(HTTPException) as error:
+                await result_cache.load_embed_result("q", "graph", cluster=cluster)
+            assert error.value.status_code == 404
+
+    asyncio.run(scenario())
+    assert len(executions) == 1
+
+
+def test_malformed_cluster_is_rejected_before_any_query(executions):
+    with pytest.raises(HTTPException):
+        asyncio.run(result_cache.load_embed_result("q", "graph", cluster="c0;DROP"))
+    assert executions == []
@@ -0,0 +1,78 @@
+import asyncio
+
+from app.services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+        return results, flight.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [1] * 5
+    assert stats["executions"] == 1 and stats["coalesced"] == 4 and stats["inFlight"] == 0
+
+
+def test_caller_after_abandoned_execution_starts_fresh():
+    async def scenario():
+        flight = SingleFlight()
+        unwinding = asyncio.Event()
+        release = asyncio.Event()
+        runs = 0
+
+        async def work():
+            nonlocal runs
+            runs += 1
+            if runs == 1:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    # Slow cleanup, like closing a Neo4j session.
+                    unwinding.set()
+                    await release.wait()
+                    raise
+            return "fresh"
+
+        first = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await unwinding.wait()
+        # The abandoned task is still unwinding; a new caller must not join it.
+        try:
+            second = await asyncio.wait_for(flight.do("k", work), 1)
+        finally:
+            release.set()
+        await asyncio.gather(first, return_exceptions=True)
+        return second, flight.stats()
+
+    second, stats = asyncio.run(scenario())
+    assert second == "fresh"
+    assert stats["executions"] == 2 and stats["abandoned"] == 1
+
+
+def test_cancelling_one_of_several_callers_keeps_the_execution():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, flight.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result == "done"
+    assert stats["abandoned"] == 0